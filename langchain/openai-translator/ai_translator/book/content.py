@@ -1,9 +1,6 @@
-import pandas as pd
-
+import json
 from enum import Enum, auto
-from PIL import Image as PILImage
 from utils import LOG
-from io import StringIO
 
 class ContentType(Enum):
     TEXT = auto()
@@ -11,6 +8,8 @@ class ContentType(Enum):
     IMAGE = auto()
 
 class Content:
+    __slots__ = ("content_type", "original", "translation", "status")
+
     def __init__(self, content_type, original, translation=None):
         self.content_type = content_type
         self.original = original
@@ -23,13 +22,22 @@ class Content:
         self.translation = translation
         self.status = status
 
+    def copy_translation(self, other: "Content"):
+        # Reuse the translation of an identical content; table rows are copied so update_item stays local
+        translation = other.translation
+        if isinstance(translation, list):
+            translation = list(translation)
+        self.translation = translation
+        self.status = other.status
+
     def check_translation_type(self, translation):
         if self.content_type == ContentType.TEXT and isinstance(translation, str):
             return True
         elif self.content_type == ContentType.TABLE and isinstance(translation, list):
             return True
-        elif self.content_type == ContentType.IMAGE and isinstance(translation, PILImage.Image):
-            return True
+        elif self.content_type == ContentType.IMAGE:
+            from PIL import Image as PILImage
+            return isinstance(translation, PILImage.Image)
         return False
 
     def __str__(self):
@@ -37,49 +45,145 @@ class Content:
 
 
 class TableContent(Content):
+    # Cells are kept as a list of row tuples: `original` holds the extracted rows,
+    # `translation` holds the header row followed by the body rows.
+    # A pandas DataFrame is only built on request (original_dataframe / translation_dataframe).
+    # `shared_cells` maps cells already sent by an earlier table of the run to that table.
+    __slots__ = ("shared_cells",)
+
     def __init__(self, data, translation=None):
-        df = pd.DataFrame(data)
+        columns = max((len(row) for row in data), default=0)
+
+        # Verify that the extracted table data is rectangular (short rows are padded like pandas does)
+        if not data or len(data[0]) != columns:
+            raise ValueError("The number of rows and columns in the extracted table data do not match.")
 
-        # Verify if the number of rows and columns in the data and DataFrame object match
-        if len(data) != len(df) or len(data[0]) != len(df.columns):
-            raise ValueError("The number of rows and columns in the extracted table data and DataFrame object do not match.")
-        
-        super().__init__(ContentType.TABLE, df)
+        rows = [tuple(row) + (None,) * (columns - len(row)) for row in data]
+        super().__init__(ContentType.TABLE, rows)
+        self.shared_cells = {}
 
     def set_translation(self, translation, status):
+        # The reply is a JSON array with one translation per cell of request_cells()
         try:
             if not isinstance(translation, str):
                 raise ValueError(f"Invalid translation type. Expected str, but got {type(translation)}")
 
             LOG.debug(f"[translation]\n{translation}")
-            # Extract column names from the first set of brackets
-            header = translation.split(']')[0][1:].split(', ')
-            # Extract data rows from the remaining brackets
-            data_rows = translation.split('] ')[1:]
-            # Replace Chinese punctuation and split each row into a list of values
-            data_rows = [row[1:-1].split(', ') for row in data_rows]
-            # Create a DataFrame using the extracted header and data
-            translated_df = pd.DataFrame(data_rows, columns=header)
-            LOG.debug(f"[translated_df]\n{translated_df}")
-            self.translation = translated_df
-            self.status = status
+            self.set_cell_translations(_parse_json_array(translation), status)
         except Exception as e:
             LOG.error(f"An error occurred during table translation: {e}")
             self.translation = None
             self.status = False
 
+    def set_cell_translations(self, translations, status):
+        cells = self.request_cells()
+        if len(translations) != len(cells):
+            raise ValueError(f"{len(cells)} cells sent, but {len(translations)} translations returned")
+
+        # Every occurrence of a cell gets its translation, numbers and empty cells are kept as they are;
+        # shared cells keep their source text until resolve_shared_cells()
+        mapping = dict(zip(cells, (str(translation) for translation in translations)))
+        rows = [tuple(mapping.get(cell, "" if cell is None else cell) for cell in row) for row in self.original]
+        LOG.debug(f"[translated_rows]\n{rows}")
+        # The first row is the header
+        self.translation = rows
+        self.status = status
+
+    def translatable_cells(self):
+        # Unique cells that contain any letters, in order of first appearance
+        return list(dict.fromkeys(cell for row in self.original for cell in row if _is_translatable(cell)))
+
+    def accepts_translation(self, translation) -> bool:
+        # A reply is only usable (and cacheable) as a JSON array with one item per request cell
+        try:
+            return len(_parse_json_array(translation)) == len(self.request_cells())
+        except (ValueError, TypeError, AttributeError):
+            return False
+
+    def request_cells(self):
+        # The translatable cells this table sends itself, the shared cells come from earlier tables
+        return [cell for cell in self.translatable_cells() if cell not in self.shared_cells]
+
+    def get_cells_as_json(self) -> str:
+        return json.dumps(self.request_cells(), ensure_ascii=False, separators=(",", ":"))
+
+    def translated_cell(self, cell):
+        # Translation of a cell of this table, None if the table's own request failed
+        if self.translation is None:
+            return None
+        for original_row, translated_row in zip(self.original, self.translation):
+            for original_cell, translated_cell in zip(original_row, translated_row):
+                if original_cell == cell:
+                    return translated_cell
+        return None
+
+    def resolve_shared_cells(self):
+        # Fill in the cells translated by earlier tables, once those tables have their translations;
+        # the table counts as failed if any of them failed
+        if self.translation is None:
+            return
+        mapping = {cell: source.translated_cell(cell) for cell, source in self.shared_cells.items()}
+        if any(translation is None for translation in mapping.values()):
+            self.status = False
+            return
+        self.translation = [
+            tuple(mapping.get(original_cell, translated_cell) for original_cell, translated_cell in zip(original_row, translated_row))
+            for original_row, translated_row in zip(self.original, self.translation)
+        ]
+
     def __str__(self):
-        return self.original.to_string(header=False, index=False)
+        return self.get_original_as_str()
 
     def iter_items(self, translated=False):
-        target_df = self.translation if translated else self.original
-        for row_idx, row in target_df.iterrows():
+        target_rows = self.translation[1:] if translated else self.original
+        for row_idx, row in enumerate(target_rows):
             for col_idx, item in enumerate(row):
                 yield (row_idx, col_idx, item)
 
     def update_item(self, row_idx, col_idx, new_value, translated=False):
-        target_df = self.translation if translated else self.original
-        target_df.at[row_idx, col_idx] = new_value
+        target_rows = self.translation if translated else self.original
+        # The translated header occupies the first row
+        if translated:
+            row_idx += 1
+        row = target_rows[row_idx]
+        target_rows[row_idx] = row[:col_idx] + (new_value,) + row[col_idx + 1:]
 
     def get_original_as_str(self):
-        return self.original.to_string(header=False, index=False)
\ No newline at end of file
+        return _format_rows(self.original)
+
+    def original_dataframe(self):
+        import pandas as pd
+        return pd.DataFrame(self.original)
+
+    def translation_dataframe(self):
+        import pandas as pd
+        return pd.DataFrame(self.translation[1:], columns=self.translation[0])
+
+
+def _format_cell(cell) -> str:
+    # Same rendering as pandas uses for object cells (lists print as "[a, b]")
+    if isinstance(cell, (list, tuple)):
+        return "[" + ", ".join(_format_cell(item) for item in cell) + "]"
+    return str(cell)
+
+
+def _format_rows(rows) -> str:
+    # Right-aligned columns without header or index, like DataFrame.to_string(header=False, index=False)
+    formatted = [[_format_cell(cell) for cell in row] for row in rows]
+    widths = [max(len(row[col_idx]) for row in formatted) for col_idx in range(len(formatted[0]))] if formatted else []
+    return "\n".join(" ".join(cell.rjust(width) for cell, width in zip(row, widths)) for row in formatted)
+
+
+def _is_translatable(cell) -> bool:
+    return isinstance(cell, str) and any(char.isalpha() for char in cell)
+
+
+def _parse_json_array(text: str) -> list:
+    # Models sometimes wrap the array in a code fence or a sentence, keep the outermost brackets
+    start, end = text.find("["), text.rfind("]")
+    if start < 0 or end < start:
+        raise ValueError("No JSON array found in the translation")
+    translations = json.loads(text[start:end + 1])
+    if not isinstance(translations, list):
+        raise ValueError("The translation is not a JSON array")
+    return translations
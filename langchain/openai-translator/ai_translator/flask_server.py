@@ -1,15 +1,23 @@
 import sys
 import os
+import hashlib
+import uuid
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from flask import Flask, request, send_file, jsonify
+from flask import Flask, Response, request, send_file, jsonify
 from translator import PDFTranslator, TranslationConfig
-from utils import ArgumentParser, LOG
+from translator.exceptions import JobQueueFullException
+from translator.job_queue import JobQueue, TranslationJob
+from utils import ArgumentParser, FileStore, FileTooLargeException, TranslationCache, LOG, METRICS
 
 app = Flask(__name__)
 
 TEMP_FILE_DIR = "flask_temps/"
+# 翻译进行中的输入副本与输出文件，完成后输出移入结果缓存
+WORK_FILE_DIR = os.path.join(TEMP_FILE_DIR, "work")
+
+OUTPUT_SUFFIXES = {"pdf": ".pdf", "markdown": ".md"}
 
 @app.route('/translation', methods=['POST'])
 def translation():
@@ -17,32 +25,46 @@ def translation():
         input_file = request.files['input_file']
         source_language = request.form.get('source_language', 'English')
         target_language = request.form.get('target_language', 'Chinese')
+        output_file_format = request.form.get('output_file_format', 'markdown')
 
         LOG.debug(f"[input_file]\n{input_file}")
         LOG.debug(f"[input_file.filename]\n{input_file.filename}")
 
         if input_file and input_file.filename:
-            # # 创建临时文件
-            input_file_path = TEMP_FILE_DIR+input_file.filename
-            LOG.debug(f"[input_file_path]\n{input_file_path}")
-
-            input_file.save(input_file_path)
-
-            # 调用翻译函数
-            output_file_path = Translator.translate_pdf(
-                input_file=input_file_path,
-                source_language=source_language,
-                target_language=target_language)
-            
-            # 移除临时文件
-            # os.remove(input_file_path)
-
-            # 构造完整的文件路径
-            output_file_path = os.getcwd() + "/" + output_file_path
-            LOG.debug(output_file_path)
+            # 上传落盘时即为本次请求建立独立的输入副本，其它请求的淘汰不会删掉它
+            work_file_path = make_work_path()
+            upload_hash, _ = Uploads.save_stream(input_file.stream, suffix=".pdf", link_path=work_file_path)
+            LOG.debug(f"[upload]\n{upload_hash}")
+
+            try:
+                # 相同文件、模型、语言与格式直接返回已缓存的译文
+                result_name = make_result_name(upload_hash, source_language, target_language, output_file_format)
+                result_path = Results.get(result_name)
+                if result_path is None:
+                    # 调用翻译函数
+                    failures = []
+                    output_file_path = Translator.translate_pdf(
+                        input_file=work_file_path,
+                        output_file_format=output_file_format,
+                        source_language=source_language,
+                        target_language=target_language,
+                        on_failures=failures.append)
+                    if any(failures):
+                        # 部分内容翻译失败，译文不进入结果缓存，发送后即删除
+                        response = send_result(output_file_path, input_file.filename)
+                        response.call_on_close(lambda: os.remove(output_file_path))
+                        return response
+                    result_path = Results.put(output_file_path, result_name)
+                else:
+                    LOG.info(f"Result cache hit: {result_name}")
+            finally:
+                # 移除临时文件
+                os.remove(work_file_path)
 
             # 返回翻译后的文件
-            return send_file(output_file_path, as_attachment=True)
+            return send_result(result_path, input_file.filename)
+    except FileTooLargeException as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 413
     except Exception as e:
         response = {
             'status': 'error',
@@ -51,6 +73,116 @@ def translation():
         return jsonify(response), 400
 
 
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    # 异步翻译：立即返回 job_id，由后台工作线程完成翻译
+    input_file = request.files.get('input_file')
+    if not input_file or not input_file.filename:
+        return jsonify({'status': 'error', 'message': 'input_file is required'}), 400
+
+    config = TranslationConfig()
+    # 排队期间上传文件可能被淘汰，落盘时即为任务建立独立的输入副本
+    work_file_path = make_work_path()
+    try:
+        upload_hash, _ = Uploads.save_stream(input_file.stream, suffix=".pdf", link_path=work_file_path)
+    except FileTooLargeException as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 413
+
+    job = TranslationJob(
+        input_file=work_file_path,
+        output_file_format=request.form.get('output_file_format', config.output_file_format),
+        source_language=request.form.get('source_language', 'English'),
+        target_language=request.form.get('target_language', 'Chinese'))
+    job.download_name = input_file.filename
+    job.result_name = make_result_name(upload_hash, job.source_language, job.target_language, job.output_file_format)
+
+    try:
+        job.page_count = Translator.pdf_parser.page_count(work_file_path)
+        result_path = Results.get(job.result_name)
+        if result_path is not None:
+            # 结果缓存命中，任务直接完成
+            os.remove(work_file_path)
+            Jobs.add_finished(job, result_path)
+            return jsonify(job.to_dict()), 200
+
+        Jobs.submit(job)
+    except JobQueueFullException as e:
+        os.remove(work_file_path)
+        response = jsonify({'status': 'error', 'message': str(e)})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    except Exception as e:
+        if os.path.exists(work_file_path):
+            os.remove(work_file_path)
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    return jsonify(job.to_dict()), 202
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = Jobs.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': f'unknown job {job_id}'}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job = Jobs.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': f'unknown job {job_id}'}), 404
+    if job.status != "done":
+        return jsonify(job.to_dict()), 409
+    if not os.path.exists(job.output_file_path):
+        return jsonify({'status': 'error', 'message': f'result of job {job_id} has been evicted'}), 410
+    return send_result(job.output_file_path, job.download_name)
+
+
+def run_job(job, on_page):
+    # 每个任务使用独立的输入副本，同一上传的多个任务输出互不覆盖
+    def on_failures(failed):
+        job.failed_contents = failed
+
+    try:
+        output_file_path = Translator.translate_pdf_streaming(
+            job.input_file,
+            job.output_file_format,
+            source_language=job.source_language,
+            target_language=job.target_language,
+            on_page=on_page,
+            on_failures=on_failures)
+    finally:
+        os.remove(job.input_file)
+    if job.failed_contents:
+        # 部分内容翻译失败，以任务自身的名字存放，其它请求不会命中，仍按大小和时间淘汰
+        return Results.put(output_file_path, job.job_id + os.path.splitext(job.result_name)[1])
+    return Results.put(output_file_path, job.result_name)
+
+
+def make_result_name(upload_hash, source_language, target_language, output_file_format):
+    key = "\x1f".join([upload_hash, TranslationConfig().model_name, source_language, target_language, output_file_format.lower()])
+    suffix = OUTPUT_SUFFIXES.get(output_file_format.lower(), "")
+    return hashlib.sha256(key.encode("utf-8")).hexdigest() + suffix
+
+
+def make_work_path():
+    return os.path.join(WORK_FILE_DIR, f"{uuid.uuid4().hex}.pdf")
+
+
+def send_result(result_path, upload_filename):
+    download_name = os.path.splitext(os.path.basename(upload_filename))[0] + "_translated" + os.path.splitext(result_path)[1]
+    return send_file(os.path.abspath(result_path), as_attachment=True, download_name=download_name)
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    # Prometheus 抓取端点，需在配置中开启 prometheus_metrics
+    if not TranslationConfig().prometheus_metrics:
+        return jsonify({'status': 'error', 'message': 'metrics endpoint is disabled'}), 404
+    return Response(METRICS.to_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
 def initialize_translator():
     # 解析命令行
     argument_parser = ArgumentParser()
@@ -61,7 +193,23 @@ def initialize_translator():
     config.initialize(args)    
     # 实例化 PDFTranslator 类，并调用 translate_pdf() 方法
     global Translator
-    Translator = PDFTranslator(config.model_name)
+    Translator = PDFTranslator(
+        config.model_name,
+        concurrency=config.concurrency,
+        parse_workers=config.parse_workers,
+        chunk_token_budget=config.chunk_token_budget,
+        dedup=config.dedup,
+        cache=TranslationCache(config.cache_file, max_entries=config.cache_size, mode=config.cache_mode))
+
+    # 后台翻译任务队列
+    global Jobs
+    Jobs = JobQueue(run_job, workers=config.job_workers, max_queued=config.job_queue_size)
+
+    # 上传文件按内容寻址存放，上传与译文均按大小和时间淘汰
+    global Uploads, Results
+    Uploads = FileStore(TEMP_FILE_DIR, config.upload_store_mb << 20, config.upload_store_hours * 3600)
+    Results = FileStore(config.result_store_dir, config.result_store_mb << 20, config.result_store_hours * 3600)
+    os.makedirs(WORK_FILE_DIR, exist_ok=True)
 
 
 if __name__ == "__main__":
@@ -1,20 +1,30 @@
 import sys
 import os
+import tempfile
 import gradio as gr
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from utils import ArgumentParser, LOG
+from utils import ArgumentParser, TranslationCache, LOG
 from translator import PDFTranslator, TranslationConfig
 
 
 def translation(input_file, source_language, target_language):
     LOG.debug(f"[翻译任务]\n源文件: {input_file.name}\n源语言: {source_language}\n目标语言: {target_language}")
 
-    output_file_path = Translator.translate_pdf(
-        input_file.name, source_language=source_language, target_language=target_language)
+    # Gradio 会复用相同上传的临时文件，译文写入每个请求独立的目录，并发用户互不覆盖
+    output_file_path = os.path.join(
+        tempfile.mkdtemp(prefix="translation_"),
+        os.path.splitext(os.path.basename(input_file.name))[0] + "_translated.md")
 
-    return output_file_path
+    # 译文随 token 逐步显示，全部写入文件后再提供下载
+    for text, pages_done, pages_parsed, output_file_path in Translator.translate_pdf_progress(
+            input_file.name, source_language=source_language, target_language=target_language,
+            output_file_path=output_file_path):
+        if output_file_path is None:
+            yield text, f"已翻译 {pages_done} / {pages_parsed} 页", None
+        else:
+            yield text, f"翻译完成，共 {pages_done} 页", output_file_path
 
 def launch_gradio():
 
@@ -27,11 +37,16 @@ def launch_gradio():
             gr.Textbox(label="目标语言（默认：中文）", placeholder="Chinese", value="Chinese")
         ],
         outputs=[
+            gr.Textbox(label="译文预览", lines=20, max_lines=20, autoscroll=True),
+            gr.Textbox(label="进度"),
             gr.File(label="下载翻译文件")
         ],
         allow_flagging="never"
     )
 
+    # 生成器函数需要开启队列才能逐步推送结果；同时处理的请求数与排队上限可在配置中调整
+    config = TranslationConfig()
+    iface.queue(default_concurrency_limit=config.gradio_concurrency, max_size=config.gradio_queue_size)
     iface.launch(share=True, server_name="0.0.0.0")
 
 def initialize_translator():
@@ -44,7 +59,13 @@ def initialize_translator():
     config.initialize(args)    
     # 实例化 PDFTranslator 类，并调用 translate_pdf() 方法
     global Translator
-    Translator = PDFTranslator(config.model_name)
+    Translator = PDFTranslator(
+        config.model_name,
+        concurrency=config.concurrency,
+        parse_workers=config.parse_workers,
+        chunk_token_budget=config.chunk_token_budget,
+        dedup=config.dedup,
+        cache=TranslationCache(config.cache_file, max_entries=config.cache_size, mode=config.cache_mode))
 
 
 if __name__ == "__main__":
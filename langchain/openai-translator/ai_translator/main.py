@@ -3,8 +3,8 @@ import os
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from utils import ArgumentParser, LOG
-from translator import PDFTranslator, TranslationConfig
+from utils import ArgumentParser, TranslationCache, LOG, METRICS
+from translator import TranslationConfig
 
 if __name__ == "__main__":
     # 解析命令行
@@ -15,6 +15,39 @@ if __name__ == "__main__":
     config = TranslationConfig()
     config.initialize(args)    
 
+    # 合并各分片的翻译结果，不需要加载 langchain
+    if config.merge_shards:
+        from translator.shard import merge_shards
+        merge_shards(config.merge_shards, config.output_file_format)
+        sys.exit(0)
+
+    # 解析完命令行再导入 PDFTranslator，--help 等短命令不必加载 langchain、PDF 相关的重量级依赖
+    from translator import PDFTranslator
+
     # 实例化 PDFTranslator 类，并调用 translate_pdf() 方法
-    translator = PDFTranslator(config.model_name)
-    translator.translate_pdf(config.input_file, config.output_file_format, pages=None)
+    translator = PDFTranslator(
+        config.model_name,
+        concurrency=config.concurrency,
+        parse_workers=config.parse_workers,
+        chunk_token_budget=config.chunk_token_budget,
+        dedup=config.dedup,
+        cache=TranslationCache(config.cache_file, max_entries=config.cache_size, mode=config.cache_mode))
+    # target_language 可以是单个语言，也可以是语言列表（一次解析，每种语言各输出一个文件）
+    target_languages = config.target_language if isinstance(config.target_language, list) else [config.target_language]
+    if config.shard_pages:
+        # 分片模式：只翻译指定页码范围，结果保存为分片文件，之后用 --merge_shards 合并
+        if len(target_languages) > 1:
+            sys.exit("分片模式只支持单个目标语言")
+        translator.translate_pdf_shard(config.input_file, config.shard_pages, config.shard_file or None,
+                                       config.source_language, target_languages[0])
+    elif config.stream and len(target_languages) == 1:
+        translator.translate_pdf_streaming(config.input_file, config.output_file_format, config.source_language, target_languages[0],
+                                           pages=None, window=config.stream_window)
+    else:
+        if config.stream:
+            LOG.warning("流式模式只支持单个目标语言，多语言改为一次解析、统一翻译")
+        translator.translate_pdf_languages(config.input_file, config.output_file_format, config.source_language, target_languages, pages=None)
+
+    if config.metrics_report:
+        METRICS.save_report(config.metrics_report)
+        LOG.info(f"Run report: {config.metrics_report}")
@@ -1,2 +1,9 @@
-from .pdf_translator import PDFTranslator
-from .translation_config import TranslationConfig
\ No newline at end of file
+from .translation_config import TranslationConfig
+
+
+def __getattr__(name):
+    # PDFTranslator pulls in pdfplumber and langchain, load it on first use
+    if name == "PDFTranslator":
+        from .pdf_translator import PDFTranslator
+        return PDFTranslator
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,87 @@
+from typing import List, Optional
+from book import Content, ContentType, Page, TableContent
+
+
+class SegmentDeduplicator:
+    # Per-run index of the segments already sent for translation: running headers, footers,
+    # boilerplate and repeated tables are translated once and the result is copied to every repeat.
+    # Table cells are indexed too, a cell sent by one table (e.g. a header row repeated on every
+    # page) is not sent again by the tables after it
+    EDGE_LINES = 2
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.primaries = {}
+        self.edge_lines = set()
+        self.cell_sources = {}
+        self.duplicates = 0
+        self.shared_cells = 0
+
+    def split_running_lines(self, page: Page):
+        # Running headers/footers sit inside the page text, move the lines already seen at the
+        # top or bottom of an earlier page into contents of their own so they can be shared
+        if not self.enabled:
+            return
+        for idx, content in enumerate(page.contents):
+            if content.content_type == ContentType.TEXT:
+                page.contents[idx:idx + 1] = self._split_text(content)
+                return
+
+    def primary_of(self, content: Content) -> Optional[Content]:
+        # The first content with the same normalized source, None if this is the first one
+        if not self.enabled:
+            return None
+        if content.content_type == ContentType.TEXT:
+            source = content.original
+        elif content.content_type == ContentType.TABLE:
+            source = content.get_original_as_str()
+        else:
+            return None
+
+        primary = self.primaries.setdefault((content.content_type, _normalize(source)), content)
+        if primary is content:
+            return None
+        self.duplicates += 1
+        return primary
+
+    def share_cells(self, table: TableContent) -> bool:
+        # Record the cells an earlier table already sends in table.shared_cells, the table becomes
+        # the source of its other cells; True if it shares any
+        if not self.enabled:
+            return False
+        for cell in table.translatable_cells():
+            source = self.cell_sources.setdefault(cell, table)
+            if source is not table:
+                table.shared_cells[cell] = source
+        self.shared_cells += len(table.shared_cells)
+        return bool(table.shared_cells)
+
+    def _split_text(self, content: Content) -> List[Content]:
+        lines = content.original.split("\n")
+
+        head = 0
+        while head < len(lines) and _normalize(lines[head]) in self.edge_lines:
+            head += 1
+        tail = len(lines)
+        while tail > head and _normalize(lines[tail - 1]) in self.edge_lines:
+            tail -= 1
+
+        self.edge_lines.update(_normalize(line) for line in lines[:self.EDGE_LINES] + lines[-self.EDGE_LINES:])
+
+        # Nothing to split off, or nothing left but repeated lines (then the whole text is shared)
+        if (head, tail) == (0, len(lines)) or head == tail:
+            return [content]
+
+        return (
+            [_text_content(line) for line in lines[:head]]
+            + [_text_content("\n".join(lines[head:tail]))]
+            + [_text_content(line) for line in lines[tail:]]
+        )
+
+
+def _text_content(text: str) -> Content:
+    return Content(content_type=ContentType.TEXT, original=text)
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
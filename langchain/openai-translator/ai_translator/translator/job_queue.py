@@ -0,0 +1,131 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+from translator.exceptions import JobQueueFullException
+from utils import LOG
+
+# Finished jobs are kept for status and download requests, the oldest are forgotten beyond this
+MAX_FINISHED_JOBS = 1000
+
+
+class TranslationJob:
+    def __init__(self, input_file: str, output_file_format: str, source_language: str, target_language: str, page_count: int = 0):
+        self.job_id = uuid.uuid4().hex
+        self.input_file = input_file
+        self.output_file_format = output_file_format
+        self.source_language = source_language
+        self.target_language = target_language
+        self.status = "queued"
+        self.page_count = page_count
+        self.pages_done = 0
+        # Contents left untranslated by failed requests, such a result is not cached
+        self.failed_contents = 0
+        self.output_file_path = None
+        # Name of the result in the server's result store and of the file offered for download
+        self.result_name = None
+        self.download_name = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def eta_seconds(self) -> Optional[float]:
+        # Average time per finished page times the pages still to go
+        if self.status != "running" or not self.pages_done or not self.page_count:
+            return None
+        elapsed = time.time() - self.started_at
+        return round(elapsed / self.pages_done * (self.page_count - self.pages_done), 1)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "pages_done": self.pages_done,
+            "page_count": self.page_count,
+            "failed_contents": self.failed_contents,
+            "eta_seconds": self.eta_seconds(),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    def __init__(self, run_job: Callable[[TranslationJob, Callable[[int], None]], str], workers: int = 2, max_queued: int = 16):
+        # run_job(job, on_page) translates the job's file and returns the output path,
+        # calling on_page(pages_done) after every written page
+        self.run_job = run_job
+        self.workers = max(1, workers)
+        self.max_jobs = self.workers + max(0, max_queued)
+        self.jobs = OrderedDict()
+        self.active = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="translation-job")
+
+    def submit(self, job: TranslationJob) -> TranslationJob:
+        with self._lock:
+            if self.active >= self.max_jobs:
+                raise JobQueueFullException(self.max_jobs)
+            self.active += 1
+            self.jobs[job.job_id] = job
+            self._forget_finished()
+
+        self._executor.submit(self._run, job)
+        LOG.info(f"Job {job.job_id} queued: {job.input_file}")
+        return job
+
+    def add_finished(self, job: TranslationJob, output_file_path: str) -> TranslationJob:
+        # Record a job whose result already exists, e.g. from a result cache
+        job.status = "done"
+        job.output_file_path = output_file_path
+        job.pages_done = job.page_count
+        job.started_at = job.finished_at = time.time()
+        with self._lock:
+            self.jobs[job.job_id] = job
+            self._forget_finished()
+        return job
+
+    def get(self, job_id: str) -> Optional[TranslationJob]:
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            running = sum(1 for job in self.jobs.values() if job.status == "running")
+            return {"workers": self.workers, "running": running, "queued": self.active - running, "max_jobs": self.max_jobs}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def _run(self, job: TranslationJob):
+        job.status = "running"
+        job.started_at = time.time()
+
+        def on_page(pages_done: int):
+            job.pages_done = pages_done
+
+        try:
+            job.output_file_path = self.run_job(job, on_page)
+            job.status = "done"
+            LOG.info(f"Job {job.job_id} done in {time.time() - job.started_at:.1f}s: {job.output_file_path}")
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+            LOG.error(f"Job {job.job_id} failed: {e}")
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self.active -= 1
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
@@ -1,13 +1,33 @@
-from typing import Optional
-from translator.pdf_parser import PDFParser
+import copy
+import os
+import queue
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List
+from book import Book, ContentType
+from translator.deduplicator import SegmentDeduplicator
+from translator.pdf_parser import PDFParser, PageSelection
+from translator.shard import save_shard
+from translator.text_chunker import TextChunker
 from translator.writer import Writer
 from translator.translation_chain import TranslationChain
-from utils import LOG
+from utils import LOG, METRICS, TranslationCache, count_tokens
+
+# Minimum time between two progress updates of translate_pdf_progress
+PROGRESS_INTERVAL = 0.2
+# translate_pdf_progress only shows the tail of the translation, the whole book is in the written file
+PREVIEW_MAX_CHARS = 4000
 
 class PDFTranslator:
-    def __init__(self, model_name: str):
-        self.translate_chain = TranslationChain(model_name)
-        self.pdf_parser = PDFParser()
+    def __init__(self, model_name: str, concurrency: int = 1, cache: TranslationCache = None, parse_workers: int = 1, chunk_token_budget: int = 0,
+                 dedup: bool = True):
+        self.translate_chain = TranslationChain(model_name, cache=cache, max_concurrency=concurrency)
+        self.concurrency = max(1, concurrency)
+        self.dedup = dedup
+        self.pdf_parser = PDFParser(workers=parse_workers)
+        # Page texts over the budget are translated as separate chunks, 0 disables chunking
+        self.chunker = TextChunker(chunk_token_budget, lambda text: count_tokens(text, model_name))
         self.writer = Writer()
 
     def translate_pdf(self,
@@ -15,15 +35,312 @@ class PDFTranslator:
                     output_file_format: str = 'markdown',
                     source_language: str = "English",
                     target_language: str = 'Chinese',
-                    pages: Optional[int] = None):
-        
-        self.book = self.pdf_parser.parse_pdf(input_file, pages)
-
-        for page_idx, page in enumerate(self.book.pages):
-            for content_idx, content in enumerate(page.contents):
-                # Translate content.original
-                translation, status = self.translate_chain.run(content, source_language, target_language)
-                # Update the content in self.book.pages directly
-                self.book.pages[page_idx].contents[content_idx].set_translation(translation, status)
-        
-        return self.writer.save_translated_book(self.book, output_file_format)
+                    pages: PageSelection = None,
+                    output_file_path: str = None,
+                    on_failures: Callable[[int], None] = None):
+        # All state of a translation is local to the call, so the servers can share one PDFTranslator
+        # across concurrent requests; output_file_path defaults to a name next to the input file.
+        # on_failures(count) receives the number of contents left untranslated by failed requests
+        report = (lambda language, failed: on_failures(failed)) if on_failures is not None else None
+        return self.translate_pdf_languages(input_file, output_file_format, source_language, [target_language], pages,
+                                            {target_language: output_file_path}, report)[target_language]
+
+    def translate_pdf_languages(self,
+                    input_file: str,
+                    output_file_format: str = 'markdown',
+                    source_language: str = "English",
+                    target_languages: List[str] = ('Chinese',),
+                    pages: PageSelection = None,
+                    output_file_paths: Dict[str, str] = None,
+                    on_failures: Callable[[str, int], None] = None) -> Dict[str, str]:
+        # Parse the book once and translate it into every target language: the segments of all languages
+        # go out as one batch and every language is written to its own file. Returns the path per language,
+        # on_failures(language, count) receives the number of untranslated contents of every language
+        target_languages = list(dict.fromkeys(target_languages))
+        output_file_paths = dict(output_file_paths or {})
+        for language in target_languages:
+            if output_file_paths.get(language) is None and len(target_languages) > 1:
+                output_file_paths[language] = _language_output_path(input_file, output_file_format, language)
+
+        book = self.pdf_parser.parse_pdf(input_file, pages)
+        books = self._translate_book(book, source_language, target_languages)
+
+        for language, language_book in books.items():
+            output_file_paths[language] = self.writer.save_translated_book(language_book, output_file_format, output_file_paths.get(language))
+            failed = _failed_contents(language_book.pages)
+            if failed:
+                LOG.warning(f"[{language}] {failed} contents could not be translated and kept their original text")
+            if on_failures is not None:
+                on_failures(language, failed)
+
+        return output_file_paths
+
+    def translate_pdf_shard(self,
+                    input_file: str,
+                    pages: PageSelection,
+                    shard_file_path: str = None,
+                    source_language: str = "English",
+                    target_language: str = 'Chinese') -> str:
+        # Translate only the selected pages (e.g. "1-500") of a book split across machines and save them
+        # as a partial result; merge_shards() combines the shards of all page ranges into the final book
+        page_indices = self.pdf_parser.page_indices(input_file, pages)
+        if not page_indices:
+            raise ValueError(f"No pages selected by {pages!r}")
+        if shard_file_path is None:
+            shard_file_path = os.path.splitext(input_file)[0] + f"_pages_{page_indices[0] + 1}-{page_indices[-1] + 1}.shard"
+
+        book = self.pdf_parser.parse_pdf(input_file, page_indices)
+        books = self._translate_book(book, source_language, [target_language])
+        save_shard(books[target_language], page_indices, self.pdf_parser.page_count(input_file), shard_file_path, source_language, target_language)
+        return shard_file_path
+
+    def _translate_book(self, book: Book, source_language: str, target_languages: List[str]) -> Dict[str, Book]:
+        splitter = SegmentDeduplicator(self.dedup)
+        for page in book.pages:
+            splitter.split_running_lines(page)
+
+        # Every language fills the translations of its own copy of the parsed book
+        books = {language: book if idx == 0 else copy.deepcopy(book) for idx, language in enumerate(target_languages)}
+
+        plans, items = {}, []
+        for language, language_book in books.items():
+            deduplicator = SegmentDeduplicator(self.dedup)
+            contents = [content for page in language_book.pages for content in page.contents]
+            plans[language] = self._plan(contents, deduplicator)
+            items.extend((segment, source_language, language) for segment in plans[language][0])
+            LOG.info(f"[{language}] {deduplicator.duplicates} repeated contents reuse an earlier translation")
+
+        with METRICS.stage("translate"):
+            # The whole book in every language goes out as one batch, results and failures come back per segment in order
+            results = self.translate_chain.batch_items(items)
+
+        offset = 0
+        for language, (segments, chunked, duplicates) in plans.items():
+            self._apply(segments, results[offset:offset + len(segments)], chunked, duplicates)
+            offset += len(segments)
+
+        if self.translate_chain.cache is not None:
+            LOG.info(f"Translation cache: {self.translate_chain.cache.stats()}")
+
+        return books
+
+    def translate_pdf_streaming(self,
+                    input_file: str,
+                    output_file_format: str = 'markdown',
+                    source_language: str = "English",
+                    target_language: str = 'Chinese',
+                    pages: PageSelection = None,
+                    window: int = 4,
+                    on_page: Callable[[int], None] = None,
+                    output_file_path: str = None,
+                    on_failures: Callable[[int], None] = None):
+        # Parse, translate and write page by page, keeping at most `window` pages in flight;
+        # on_page(pages written so far) is called after every page, on_failures(count) once at the end
+        # with the number of contents left untranslated by failed requests
+        window = max(1, window)
+        in_flight = deque()
+        failed = 0
+        deduplicator = SegmentDeduplicator(self.dedup)
+
+        with self.writer.open_translated_book(input_file, output_file_format, output_file_path) as page_writer, \
+                ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            LOG.info(f"开始导出: {page_writer.output_file_path}")
+
+            for page in self.pdf_parser.iter_pages(input_file, pages):
+                deduplicator.split_running_lines(page)
+                in_flight.append((page, self._submit(executor, page.contents, source_language, target_language, deduplicator)))
+
+                if len(in_flight) >= window:
+                    failed += self._write_oldest(in_flight, page_writer, on_page)
+
+            while in_flight:
+                failed += self._write_oldest(in_flight, page_writer, on_page)
+
+        if self.translate_chain.cache is not None:
+            LOG.info(f"Translation cache: {self.translate_chain.cache.stats()}")
+        LOG.info(f"{deduplicator.duplicates} repeated contents reused an earlier translation")
+        if failed:
+            LOG.warning(f"{failed} contents could not be translated and kept their original text")
+        if on_failures is not None:
+            on_failures(failed)
+        LOG.info(f"翻译完成，文件保存至: {page_writer.output_file_path}")
+
+        return page_writer.output_file_path
+
+    def translate_pdf_progress(self,
+                    input_file: str,
+                    output_file_format: str = 'markdown',
+                    source_language: str = "English",
+                    target_language: str = 'Chinese',
+                    pages: PageSelection = None,
+                    window: int = 8,
+                    output_file_path: str = None) -> Iterator[tuple]:
+        # For interactive front ends: streams the completions and yields
+        # (latest translated text, pages translated, pages parsed, None) while tokens arrive,
+        # then the same tuple with the path of the written file. At most `window` unfinished
+        # pages are in flight, and closing the generator (e.g. the client went away) cancels
+        # the requests not started yet instead of waiting for the rest of the book
+        window = max(1, window)
+        book = Book(input_file)
+        page_iter = self.pdf_parser.iter_pages(input_file, pages)
+        deduplicator = SegmentDeduplicator(self.dedup)
+        updates = queue.Queue()
+        streamed = {}
+        submitted_pages = []
+        parsing = True
+        pages_done = 0
+        last_update = 0.0
+
+        def translate(segment, source_language, target_language):
+            return self.translate_chain.stream(segment, source_language, target_language,
+                                               lambda piece: updates.put((id(segment), piece)))
+
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        try:
+            with METRICS.stage("translate"):
+                while True:
+                    # Parse one page per round, so the first requests go out before the whole book is parsed
+                    parsed = False
+                    if parsing and len(submitted_pages) - pages_done < window:
+                        page = next(page_iter, None)
+                        if page is None:
+                            parsing = False
+                        else:
+                            book.add_page(page)
+                            deduplicator.split_running_lines(page)
+                            submitted_pages.append(self._submit(executor, page.contents, source_language, target_language, deduplicator, translate))
+                            parsed = True
+
+                    _drain(updates, streamed, timeout=0 if parsed else PROGRESS_INTERVAL)
+                    pages_done = sum(all(future.done() for _, future in jobs) for jobs, _, _ in submitted_pages)
+                    finished = not parsing and pages_done == len(submitted_pages) and updates.empty()
+
+                    if finished or time.perf_counter() - last_update >= PROGRESS_INTERVAL:
+                        last_update = time.perf_counter()
+                        yield _streamed_text(submitted_pages, streamed), pages_done, len(submitted_pages), None
+                    if finished:
+                        break
+
+                for submitted in submitted_pages:
+                    self._collect(submitted)
+        finally:
+            # Everything is done on success; on an early close only the running requests are left to finish
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if self.translate_chain.cache is not None:
+            LOG.info(f"Translation cache: {self.translate_chain.cache.stats()}")
+        LOG.info(f"{deduplicator.duplicates} repeated contents reused an earlier translation")
+
+        output_file_path = self.writer.save_translated_book(book, output_file_format, output_file_path)
+        yield _streamed_text(submitted_pages, streamed), len(submitted_pages), len(submitted_pages), output_file_path
+
+    def _write_oldest(self, in_flight, page_writer, on_page=None) -> int:
+        # Returns the number of failed contents of the written page
+        page, submitted = in_flight.popleft()
+        self._collect(submitted)
+        page_writer.write_page(page)
+        if on_page is not None:
+            on_page(page_writer.page_count)
+        return _failed_contents([page])
+
+    def _submit(self, executor, contents, source_language: str, target_language: str, deduplicator: SegmentDeduplicator, translate=None):
+        # One request per segment, for the paths that write or show pages as they finish
+        translate = translate or self.translate_chain.run
+        segments, chunked, duplicates = self._plan(contents, deduplicator)
+        jobs = [(segment, executor.submit(translate, segment, source_language, target_language)) for segment in segments]
+        return jobs, chunked, duplicates
+
+    def _plan(self, contents, deduplicator: SegmentDeduplicator):
+        # Split contents into the segments to translate, the chunked contents and the repeats
+        segments, chunked, duplicates = [], [], []
+        for content in contents:
+            # Repeats of a content already in this run only wait for its translation
+            primary = deduplicator.primary_of(content)
+            if primary is not None:
+                duplicates.append((content, primary))
+                continue
+
+            if content.content_type == ContentType.TABLE:
+                # Cells an earlier table already sends are filled in from it after the requests,
+                # entries without a primary tell _apply to do so
+                if deduplicator.share_cells(content):
+                    duplicates.append((content, None))
+                # Tables of only numbers, empty or shared cells need no request
+                if not content.request_cells():
+                    content.set_cell_translations([], True)
+                    continue
+
+            chunks = self.chunker.split_content(content)
+            if chunks is not None:
+                # Oversized text goes out as separate chunks, _apply stitches them back together
+                chunked.append((content, chunks))
+            segments.extend(chunks or [content])
+        # Repeats that reuse a translation instead of being sent, and table cells taken from an earlier table
+        METRICS.increment("dedup_contents_reused", sum(primary is not None for _, primary in duplicates))
+        METRICS.increment("dedup_cells_reused", sum(len(content.shared_cells) for content, primary in duplicates if primary is None))
+        return segments, chunked, duplicates
+
+    def _collect(self, submitted):
+        jobs, chunked, duplicates = submitted
+        self._apply([segment for segment, _ in jobs], [future.result() for _, future in jobs], chunked, duplicates)
+
+    def _apply(self, segments, results, chunked, duplicates):
+        for content, (translation, status) in zip(segments, results):
+            # Update the content in the book pages directly
+            content.set_translation(translation, status)
+
+        for content, chunks in chunked:
+            status = all(chunk.status for chunk in chunks)
+            content.set_translation(self.chunker.stitch([chunk.translation for chunk in chunks]), status)
+
+        # Primaries and shared cells come from this or an earlier page, so their translations are already in place
+        for content, primary in duplicates:
+            if primary is None:
+                content.resolve_shared_cells()
+            else:
+                content.copy_translation(primary)
+
+
+def _failed_contents(pages) -> int:
+    # Text and table contents whose translation failed, the writers keep their original text
+    return sum(
+        not content.status
+        for page in pages
+        for content in page.contents
+        if content.content_type in (ContentType.TEXT, ContentType.TABLE)
+    )
+
+
+def _drain(updates: queue.Queue, streamed: dict, timeout: float):
+    # Wait up to `timeout` for the first new piece of text, then take whatever else has arrived
+    try:
+        segment_id, piece = updates.get(timeout=timeout) if timeout else updates.get_nowait()
+    except queue.Empty:
+        return
+    while True:
+        streamed.setdefault(segment_id, []).append(piece)
+        try:
+            segment_id, piece = updates.get_nowait()
+        except queue.Empty:
+            return
+
+
+def _streamed_text(submitted_pages, streamed: dict) -> str:
+    # The newest PREVIEW_MAX_CHARS of translated text, walking back from the last submitted page
+    # so the cost of an update does not grow with the pages already translated
+    parts, size = [], 0
+    for jobs, _, _ in reversed(submitted_pages):
+        for segment, _ in reversed(jobs):
+            pieces = streamed.get(id(segment))
+            if not pieces:
+                continue
+            parts.append("".join(pieces))
+            size += len(parts[-1]) + 2
+            if size >= PREVIEW_MAX_CHARS:
+                return "\n\n".join(reversed(parts))[-PREVIEW_MAX_CHARS:]
+    return "\n\n".join(reversed(parts))
+
+
+def _language_output_path(input_file: str, output_file_format: str, language: str) -> str:
+    extension = '.pdf' if output_file_format.lower() == 'pdf' else '.md'
+    return os.path.splitext(input_file)[0] + f"_translated_{language.replace(' ', '_')}{extension}"
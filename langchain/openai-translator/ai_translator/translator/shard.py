@@ -0,0 +1,93 @@
+import gzip
+import hashlib
+import json
+from typing import List
+
+from book import Book, Content, ContentType, Page
+from translator.writer import Writer
+from utils import LOG
+
+SHARD_VERSION = 1
+CONTENT_TYPE_NAMES = {ContentType.TEXT: "text", ContentType.TABLE: "table"}
+CONTENT_TYPES = {name: content_type for content_type, name in CONTENT_TYPE_NAMES.items()}
+
+
+def save_shard(book: Book, page_indices: List[int], page_count: int, shard_file_path: str, source_language: str, target_language: str):
+    # Partial result of a page range: gzipped JSON lines, a header and then one line per page.
+    # Only what the writers need is kept, the type, status and translation of every content
+    header = {
+        "version": SHARD_VERSION,
+        "book": _hash_file(book.pdf_file_path),
+        "input_file": book.pdf_file_path,
+        "page_count": page_count,
+        "source_language": source_language,
+        "target_language": target_language,
+    }
+    with gzip.open(shard_file_path, "wt", encoding="utf-8") as shard_file:
+        shard_file.write(json.dumps(header, ensure_ascii=False) + "\n")
+        for page_idx, page in zip(page_indices, book.pages):
+            contents = [
+                [CONTENT_TYPE_NAMES[content.content_type], content.status, content.translation]
+                for content in page.contents
+                if content.content_type in CONTENT_TYPE_NAMES
+            ]
+            shard_file.write(json.dumps({"page": page_idx, "contents": contents}, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    LOG.info(f"Saved {len(page_indices)} translated pages to {shard_file_path}")
+
+
+def load_shards(shard_file_paths: List[str]) -> Book:
+    # Combine the shards of one book and target language into a book of translated pages, in page order
+    header, pages = None, {}
+    for shard_file_path in shard_file_paths:
+        with gzip.open(shard_file_path, "rt", encoding="utf-8") as shard_file:
+            shard_header = json.loads(next(shard_file))
+            if shard_header.get("version") != SHARD_VERSION:
+                raise ValueError(f"Unsupported shard version in {shard_file_path}: {shard_header.get('version')}")
+            if header is None:
+                header = shard_header
+            elif (shard_header["book"], shard_header["target_language"]) != (header["book"], header["target_language"]):
+                raise ValueError(f"{shard_file_path} belongs to another book or target language")
+
+            for line in shard_file:
+                record = json.loads(line)
+                if record["page"] in pages:
+                    raise ValueError(f"Page {record['page'] + 1} is in more than one shard")
+                pages[record["page"]] = _load_page(record["contents"])
+
+    if header is None:
+        raise ValueError("No shard files given")
+
+    missing = header["page_count"] - len(pages)
+    if missing:
+        LOG.warning(f"{missing} of {header['page_count']} pages are in none of the shards and are left out")
+
+    book = Book(header["input_file"])
+    for page_idx in sorted(pages):
+        book.add_page(pages[page_idx])
+    return book
+
+
+def merge_shards(shard_file_paths: List[str], output_file_format: str, output_file_path: str = None) -> str:
+    return Writer().save_translated_book(load_shards(shard_file_paths), output_file_format, output_file_path)
+
+
+def _load_page(contents) -> Page:
+    page = Page()
+    for type_name, status, translation in contents:
+        content = Content(CONTENT_TYPES[type_name], original=None)
+        if type_name == "table" and translation is not None:
+            # JSON has no tuples, the writers expect row tuples like TableContent
+            translation = [tuple(row) for row in translation]
+        content.translation = translation
+        content.status = status
+        page.add_content(content)
+    return page
+
+
+def _hash_file(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as input_file:
+        for chunk in iter(lambda: input_file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -1,12 +1,50 @@
+import time
+from typing import Callable, List
+
 from langchain_openai import ChatOpenAI
-from langchain.chains import LLMChain
 
-from utils import LOG
+from book import TableContent
+from utils import LOG, METRICS, TranslationCache
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.prompts import ChatPromptTemplate, HumanMessagePromptTemplate, SystemMessagePromptTemplate
 
+# Tables go out as a compact JSON array of their unique translatable cells
+TABLE_INSTRUCTION = "The JSON array below holds the cells of a table. Translate every item and reply with only a JSON array of the same length and order:\n"
+
+
+class MetricsHandler(BaseCallbackHandler):
+    # Records the latency and the token usage reported by OpenAI of every model call,
+    # including the calls a batch runs concurrently
+    def __init__(self):
+        self._started = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._observe_latency(run_id)
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        METRICS.increment("prompt_tokens", usage.get("prompt_tokens", 0))
+        METRICS.increment("completion_tokens", usage.get("completion_tokens", 0))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._observe_latency(run_id)
+
+    def _observe_latency(self, run_id):
+        start = self._started.pop(run_id, None)
+        if start is not None:
+            METRICS.observe("request_latency_seconds", time.perf_counter() - start)
+
+
 class TranslationChain:
-    def __init__(self, model_name: str = "gpt-3.5-turbo", verbose: bool = True):
-        
+    def __init__(self, model_name: str = "gpt-3.5-turbo", verbose: bool = False, cache: TranslationCache = None, max_concurrency: int = 1):
+        self.model_name = model_name
+        self.cache = cache
+        self.max_concurrency = max(1, max_concurrency)
+
         # 翻译任务指令始终由 System 角色承担
         template = (
             """You are a translation expert, proficient in various languages. \n
@@ -26,18 +64,125 @@ class TranslationChain:
         # 为了翻译结果的稳定性，将 temperature 设置为 0
         chat = ChatOpenAI(model_name=model_name, temperature=0, verbose=verbose)
 
-        self.chain = LLMChain(llm=chat, prompt=chat_prompt_template, verbose=verbose)
+        # Prompt-to-model runnable (LCEL), supports invoke, stream, batch and abatch
+        self.chain = chat_prompt_template | chat
+        self.metrics_handler = MetricsHandler()
 
     def run(self, text: str, source_language: str, target_language: str) -> (str, bool):
+        return self._translate(text, source_language, target_language,
+                               lambda inputs: self.chain.invoke(inputs, config=self._config()).content)
+
+    def stream(self, text: str, source_language: str, target_language: str, on_token: Callable[[str], None]) -> (str, bool):
+        # Same as run, but the completion is streamed and on_token receives every new piece of text
+        return self._translate(text, source_language, target_language,
+                               lambda inputs: self._stream(inputs, on_token), on_token)
+
+    def batch(self, texts: List, source_language: str, target_language: str) -> List[tuple]:
+        # Translate many texts at once, at most max_concurrency requests in flight;
+        # returns one (result, status) per text in the same order, a failure only affects its own item
+        return self.batch_items([(text, source_language, target_language) for text in texts])
+
+    def batch_items(self, items: List[tuple]) -> List[tuple]:
+        # Same as batch, for (text, source language, target language) items that may differ in their languages
+        results, pending = self._lookup_all(items)
+        if pending:
+            outputs = self.chain.batch([inputs for _, _, inputs in pending], config=self._config(), return_exceptions=True)
+            self._store_all(items, results, pending, outputs)
+        return results
+
+    async def abatch(self, texts: List, source_language: str, target_language: str) -> List[tuple]:
+        # Async counterpart of batch
+        items = [(text, source_language, target_language) for text in texts]
+        results, pending = self._lookup_all(items)
+        if pending:
+            outputs = await self.chain.abatch([inputs for _, _, inputs in pending], config=self._config(), return_exceptions=True)
+            self._store_all(items, results, pending, outputs)
+        return results
+
+    def _config(self) -> dict:
+        return {"callbacks": [self.metrics_handler], "max_concurrency": self.max_concurrency}
+
+    def _stream(self, inputs: dict, on_token: Callable[[str], None]) -> str:
+        pieces = []
+        for chunk in self.chain.stream(inputs, config=self._config()):
+            pieces.append(chunk.content)
+            on_token(chunk.content)
+        return "".join(pieces)
+
+    def _translate(self, text, source_language: str, target_language: str, complete, on_token=None) -> (str, bool):
+        key, cached = self._lookup(text, source_language, target_language)
+        if cached is not None:
+            if on_token is not None:
+                on_token(cached)
+            return cached, True
+
         result = ""
+        METRICS.increment("requests")
         try:
-            result = self.chain.run({
-                "text": text,
-                "source_language": source_language,
-                "target_language": target_language,
-            })
+            result = complete(_inputs(text, source_language, target_language))
         except Exception as e:
             LOG.error(f"An error occurred during translation: {e}")
+            METRICS.increment("request_failures")
             return result, False
 
-        return result, True
\ No newline at end of file
+        if key is not None and _cacheable(text, result):
+            self.cache.put(key, result)
+
+        return result, True
+
+    def _lookup(self, text, source_language: str, target_language: str):
+        if self.cache is None:
+            return None, None
+
+        key = self.cache.make_key(_human_text(text), self.model_name, source_language, target_language)
+        cached = self.cache.get(key)
+        if cached is not None and not _cacheable(text, cached):
+            # e.g. a table reply cached before replies were checked, ask again
+            cached = None
+        METRICS.increment("cache_hits" if cached is not None else "cache_misses")
+        return key, cached
+
+    def _lookup_all(self, items: List[tuple]):
+        # Cached texts are answered right away, the rest become (index, cache key, inputs) for the batch
+        results, pending = [None] * len(items), []
+        for idx, (text, source_language, target_language) in enumerate(items):
+            key, cached = self._lookup(text, source_language, target_language)
+            if cached is not None:
+                results[idx] = (cached, True)
+            else:
+                pending.append((idx, key, _inputs(text, source_language, target_language)))
+        return results, pending
+
+    def _store_all(self, items, results, pending, outputs):
+        METRICS.increment("requests", len(pending))
+        for (idx, key, _), output in zip(pending, outputs):
+            if isinstance(output, Exception):
+                LOG.error(f"An error occurred during translation: {output}")
+                METRICS.increment("request_failures")
+                results[idx] = ("", False)
+                continue
+
+            results[idx] = (output.content, True)
+            if key is not None and _cacheable(items[idx][0], output.content):
+                self.cache.put(key, output.content)
+
+
+def _inputs(text, source_language: str, target_language: str) -> dict:
+    return {
+        "text": _human_text(text),
+        "source_language": source_language,
+        "target_language": target_language,
+    }
+
+
+def _cacheable(text, translation: str) -> bool:
+    # A table reply that does not parse into its cells must not be cached and served again
+    if isinstance(text, TableContent):
+        return text.accepts_translation(translation)
+    return True
+
+
+def _human_text(text) -> str:
+    if isinstance(text, TableContent):
+        return TABLE_INSTRUCTION + text.get_cells_as_json()
+    return str(text)
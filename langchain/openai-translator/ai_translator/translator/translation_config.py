@@ -1,5 +1,3 @@
-import yaml
-
 class TranslationConfig:
     _instance = None
     
@@ -10,6 +8,8 @@ class TranslationConfig:
         return cls._instance
     
     def initialize(self, args):
+        import yaml
+
         with open(args.config_file, "r") as f:
             config = yaml.safe_load(f)
 
@@ -1,26 +1,19 @@
 import os
-from reportlab.lib import colors, pagesizes, units
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
-)
 
-from book import Book, ContentType
-from utils import LOG
+from book import Book, Page, ContentType
+from utils import LOG, METRICS
 
 class Writer:
     def __init__(self):
         pass
 
-    def save_translated_book(self, book: Book, ouput_file_format: str):
+    def save_translated_book(self, book: Book, ouput_file_format: str, output_file_path: str = None):
         LOG.debug(ouput_file_format)
 
         if ouput_file_format.lower() == "pdf":
-            output_file_path = self._save_translated_book_pdf(book)
+            output_file_path = self._save_translated_book_pdf(book, output_file_path)
         elif ouput_file_format.lower() == "markdown":
-            output_file_path = self._save_translated_book_markdown(book)
+            output_file_path = self._save_translated_book_markdown(book, output_file_path)
         else:
             LOG.error(f"不支持文件类型: {ouput_file_format}")
             return ""
@@ -29,86 +22,111 @@ class Writer:
 
         return output_file_path
 
+    def open_translated_book(self, pdf_file_path: str, ouput_file_format: str, output_file_path: str = None):
+        # Page writer that receives translated pages one at a time (streaming mode)
+        if ouput_file_format.lower() == "pdf":
+            from translator.pdf_page_writer import PDFPageWriter
+            return PDFPageWriter(output_file_path or pdf_file_path.replace('.pdf', f'_translated.pdf'))
+        elif ouput_file_format.lower() == "markdown":
+            return MarkdownPageWriter(output_file_path or pdf_file_path.replace('.pdf', f'_translated.md'))
+        else:
+            raise ValueError(f"不支持文件类型: {ouput_file_format}")
 
-    def _save_translated_book_pdf(self, book: Book, output_file_path: str = None):
 
-        output_file_path = book.pdf_file_path.replace('.pdf', f'_translated.pdf')
+    def _save_translated_book_pdf(self, book: Book, output_file_path: str = None):
+        if output_file_path is None:
+            output_file_path = book.pdf_file_path.replace('.pdf', f'_translated.pdf')
 
         LOG.info(f"开始导出: {output_file_path}")
 
-        # Register Chinese font
-        font_path = "../fonts/simsun.ttc"  # 请将此路径替换为您的字体文件路径
-        pdfmetrics.registerFont(TTFont("SimSun", font_path))
-
-        # Create a new ParagraphStyle with the SimSun font
-        simsun_style = ParagraphStyle('SimSun', fontName='SimSun', fontSize=12, leading=14)
+        # reportlab is only imported when a PDF is actually written
+        from translator.pdf_page_writer import PDFPageWriter
 
-        # Create a PDF document
-        doc = SimpleDocTemplate(output_file_path, pagesize=pagesizes.letter)
-        styles = getSampleStyleSheet()
-        story = []
+        with PDFPageWriter(output_file_path) as page_writer:
+            # Iterate over the pages and contents
+            for page in book.pages:
+                page_writer.write_page(page)
 
-        # Iterate over the pages and contents
-        for page in book.pages:
-            for content in page.contents:
-                if content.status:
-                    if content.content_type == ContentType.TEXT:
-                        # Add translated text to the PDF
-                        text = content.translation
-                        para = Paragraph(text, simsun_style)
-                        story.append(para)
-
-                    elif content.content_type == ContentType.TABLE:
-                        # Add table to the PDF
-                        table = content.translation
-                        table_style = TableStyle([
-                            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                            ('FONTNAME', (0, 0), (-1, 0), 'SimSun'),  # 更改表头字体为 "SimSun"
-                            ('FONTSIZE', (0, 0), (-1, 0), 14),
-                            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                            ('FONTNAME', (0, 1), (-1, -1), 'SimSun'),  # 更改表格中的字体为 "SimSun"
-                            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                        ])
-                        pdf_table = Table(table.values.tolist())
-                        pdf_table.setStyle(table_style)
-                        story.append(pdf_table)
-            # Add a page break after each page except the last one
-            if page != book.pages[-1]:
-                story.append(PageBreak())
-
-        # Save the translated book as a new PDF file
-        doc.build(story)
         return output_file_path
 
 
     def _save_translated_book_markdown(self, book: Book, output_file_path: str = None):
-        output_file_path = book.pdf_file_path.replace('.pdf', f'_translated.md')
+        if output_file_path is None:
+            output_file_path = book.pdf_file_path.replace('.pdf', f'_translated.md')
 
         LOG.info(f"开始导出: {output_file_path}")
-        with open(output_file_path, 'w', encoding='utf-8') as output_file:
+        with MarkdownPageWriter(output_file_path) as page_writer:
             # Iterate over the pages and contents
             for page in book.pages:
-                for content in page.contents:
-                    if content.status:
-                        if content.content_type == ContentType.TEXT:
-                            # Add translated text to the Markdown file
-                            text = content.translation
-                            output_file.write(text + '\n\n')
-
-                        elif content.content_type == ContentType.TABLE:
-                            # Add table to the Markdown file
-                            table = content.translation
-                            header = '| ' + ' | '.join(str(column) for column in table.columns) + ' |' + '\n'
-                            separator = '| ' + ' | '.join(['---'] * len(table.columns)) + ' |' + '\n'
-                            # body = '\n'.join(['| ' + ' | '.join(row) + ' |' for row in table.values.tolist()]) + '\n\n'
-                            body = '\n'.join(['| ' + ' | '.join(str(cell) for cell in row) + ' |' for row in table.values.tolist()]) + '\n\n'
-                            output_file.write(header + separator + body)
-
-                # Add a page break (horizontal rule) after each page except the last one
-                if page != book.pages[-1]:
-                    output_file.write('---\n\n')
-
-        return output_file_path
\ No newline at end of file
+                page_writer.write_page(page)
+
+        return output_file_path
+
+
+class MarkdownPageWriter:
+    def __init__(self, output_file_path: str):
+        self.output_file_path = output_file_path
+        self.page_count = 0
+        # Pages go to a temporary file that is renamed when complete, so a failed run
+        # never leaves a silently truncated book under the final name
+        self.partial_file_path = output_file_path + ".part"
+        self.output_file = open(self.partial_file_path, 'w', encoding='utf-8')
+
+    def write_page(self, page: Page):
+        with METRICS.stage("write"):
+            # Add a page break (horizontal rule) between pages
+            if self.page_count:
+                self.output_file.write('---\n\n')
+
+            for content in page.contents:
+                self.output_file.write(_content_markdown(content))
+
+            # Make every finished page visible in the temporary file right away
+            self.output_file.flush()
+        METRICS.increment("pages_written")
+        self.page_count += 1
+
+    def close(self):
+        self.output_file.close()
+        os.replace(self.partial_file_path, self.output_file_path)
+
+    def abort(self):
+        self.output_file.close()
+        remove_partial_file(self.partial_file_path)
+        LOG.warning(f"Markdown 导出中断，已写入 {self.page_count} 页未保存: {self.output_file_path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def remove_partial_file(partial_file_path: str):
+    try:
+        os.remove(partial_file_path)
+    except FileNotFoundError:
+        pass
+
+
+def _content_markdown(content) -> str:
+    if not content.status:
+        return ""
+
+    if content.content_type == ContentType.TEXT:
+        # Add translated text to the Markdown file
+        text = content.translation
+        return text + '\n\n'
+
+    elif content.content_type == ContentType.TABLE:
+        # Add table to the Markdown file
+        columns, *rows = content.translation
+        header = '| ' + ' | '.join(str(column) for column in columns) + ' |' + '\n'
+        separator = '| ' + ' | '.join(['---'] * len(columns)) + ' |' + '\n'
+        body = '\n'.join(['| ' + ' | '.join(str(cell) for cell in row) + ' |' for row in rows]) + '\n\n'
+        return header + separator + body
+
+    return ""
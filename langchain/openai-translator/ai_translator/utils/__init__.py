@@ -1,2 +1,6 @@
 from .argument_parser import ArgumentParser
-from .logger import LOG
\ No newline at end of file
+from .logger import LOG
+from .metrics import METRICS
+from .translation_cache import TranslationCache
+from .tokens import estimate_tokens, count_tokens
+from .file_store import FileStore, FileTooLargeException
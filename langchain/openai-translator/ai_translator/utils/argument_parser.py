@@ -8,7 +8,24 @@ class ArgumentParser:
         self.parser.add_argument('--input_file', type=str, help='PDF file to translate.')
         self.parser.add_argument('--output_file_format', type=str, help='The file format of translated book. Now supporting PDF and Markdown')
         self.parser.add_argument('--source_language', type=str, help='The language of the original book to be translated.')
-        self.parser.add_argument('--target_language', type=str, help='The target language for translating the original book.')
+        self.parser.add_argument('--target_language', type=str, nargs='+', help='The target language(s) for translating the original book. Several languages are translated in one pass, one output file each.')
+        self.parser.add_argument('--shard_pages', type=str, help='Only translate these 1-based pages, e.g. "1-500" or "501-", and save them as a partial result (shard) to merge later.')
+        self.parser.add_argument('--shard_file', type=str, help='Partial result file written in shard mode. Defaults to a name next to the input file.')
+        self.parser.add_argument('--merge_shards', type=str, nargs='+', help='Combine these shard files in page order into the translated book instead of translating.')
+        self.parser.add_argument('--concurrency', type=int, help='Number of segments translated in parallel.')
+        self.parser.add_argument('--parse_workers', type=int, help='Number of processes used to parse the PDF by page ranges.')
+        self.parser.add_argument('--chunk_token_budget', type=int, help='Split page texts longer than this many tokens into chunks translated separately. 0 disables chunking.')
+        self.parser.add_argument('--dedup', action=argparse.BooleanOptionalAction, help='Translate repeated contents (running headers, footers, identical tables) once and reuse the result.')
+        self.parser.add_argument('--stream', action='store_true', default=None, help='Parse, translate and write the book page by page instead of all at once.')
+        self.parser.add_argument('--stream_window', type=int, help='Maximum number of pages in flight in streaming mode.')
+        self.parser.add_argument('--cache_file', type=str, help='SQLite file of the translation memory cache.')
+        self.parser.add_argument('--cache_size', type=int, help='Maximum number of entries kept in the translation cache.')
+        self.parser.add_argument('--cache_mode', type=str, choices=['readwrite', 'warm', 'bypass'], help='"readwrite" serves cached translations, "warm" re-translates and refreshes the cache, "bypass" disables it.')
+        self.parser.add_argument('--job_workers', type=int, help='Number of translation jobs the Flask server runs at the same time.')
+        self.parser.add_argument('--job_queue_size', type=int, help='Number of translation jobs that may wait for a free worker before new ones are rejected.')
+        self.parser.add_argument('--gradio_concurrency', type=int, help='Number of translation requests the Gradio server processes at the same time.')
+        self.parser.add_argument('--gradio_queue_size', type=int, help='Number of Gradio requests that may wait in the queue before new ones are rejected.')
+        self.parser.add_argument('--metrics_report', type=str, help='Write a JSON report of stage timings, request latencies, token counts, retries and cache hits to this file.')
 
     def parse_arguments(self):
         args = self.parser.parse_args()
@@ -0,0 +1,115 @@
+import hashlib
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Optional
+
+CHUNK_SIZE = 1 << 20
+
+
+class FileTooLargeException(Exception):
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        super().__init__(f"File too large: the limit is {max_bytes} bytes.")
+
+
+class FileStore:
+    # Directory of content-addressed files, evicted by age and then least recently used
+    # first whenever it grows over its size limit
+    def __init__(self, directory: str, max_bytes: int = 0, max_age_seconds: float = 0):
+        # A limit of 0 disables that kind of eviction
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def get(self, name: str) -> Optional[str]:
+        path = self.path(name)
+        try:
+            # Reading a file makes it the most recently used one
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def save_stream(self, stream, suffix: str = "", link_path: str = None) -> (str, str):
+        # Write the stream to disk chunk by chunk while hashing it, the file is named after its sha256.
+        # With link_path the file is also hard linked (or copied) there before any eviction runs, so the
+        # caller keeps its own copy even if the stored file is evicted by another request right after
+        digest = hashlib.sha256()
+        size = 0
+        tmp_path = self.path(f".{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp_path, "wb") as tmp_file:
+                for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                    size += len(chunk)
+                    if self.max_bytes and size > self.max_bytes:
+                        # Could never be kept, storing it would only evict everything else
+                        raise FileTooLargeException(self.max_bytes)
+                    digest.update(chunk)
+                    tmp_file.write(chunk)
+            if link_path is not None:
+                link_or_copy(tmp_path, link_path)
+        except BaseException:
+            _remove(tmp_path)
+            raise
+
+        file_hash = digest.hexdigest()
+        path = self.path(file_hash + suffix)
+        os.replace(tmp_path, path)
+        self.evict(keep=path)
+        return file_hash, path
+
+    def put(self, src_path: str, name: str) -> str:
+        # Move a finished file into the store
+        path = self.path(name)
+        os.replace(src_path, path)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep: str = None):
+        # keep is the file just written, it is never evicted by the write that added it
+        with self._lock:
+            now = time.time()
+            files, kept = [], 0
+            for entry in os.scandir(self.directory):
+                # Skip uploads still being written
+                if not entry.is_file() or entry.name.endswith(".tmp"):
+                    continue
+                stat = entry.stat()
+                if entry.path == keep:
+                    kept = stat.st_size
+                elif self.max_age_seconds and now - stat.st_mtime > self.max_age_seconds:
+                    _remove(entry.path)
+                else:
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+
+            total = kept + sum(size for _, size, _ in files)
+            if not self.max_bytes or total <= self.max_bytes:
+                return
+            for _, size, path in sorted(files):
+                _remove(path)
+                total -= size
+                if total <= self.max_bytes:
+                    return
+
+
+def link_or_copy(src_path: str, dst_path: str):
+    # A hard link costs nothing, fall back to a copy across file systems
+    try:
+        os.link(src_path, dst_path)
+    except OSError:
+        shutil.copyfile(src_path, dst_path)
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
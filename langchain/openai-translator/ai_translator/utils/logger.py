@@ -1,12 +1,14 @@
-from loguru import logger
 import os
 import sys
+import threading
 
 LOG_FILE = "translation.log"
 ROTATION_TIME = "02:00"
 
 class Logger:
     def __init__(self, name="translation", log_dir="logs", debug=False):
+        from loguru import logger
+
         if not os.path.exists(log_dir):
             os.makedirs(log_dir)
         log_file_path = os.path.join(log_dir, LOG_FILE)
@@ -21,7 +23,21 @@ class Logger:
         logger.add(log_file_path, rotation=ROTATION_TIME, level="DEBUG")
         self.logger = logger
 
-LOG = Logger(debug=True).logger
+class LazyLogger:
+    # Imports loguru and creates the log directory on the first log call instead of at import time
+    def __init__(self, **kwargs):
+        self._kwargs = kwargs
+        self._logger = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if self._logger is None:
+            with self._lock:
+                if self._logger is None:
+                    self._logger = Logger(**self._kwargs).logger
+        return getattr(self._logger, name)
+
+LOG = LazyLogger(debug=True)
 
 if __name__ == "__main__":
     log = Logger().logger
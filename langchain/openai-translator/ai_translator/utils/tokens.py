@@ -0,0 +1,32 @@
+from functools import lru_cache
+
+
+def estimate_tokens(text: str) -> int:
+    # Rough count without a tokenizer: CJK characters are ~1 token each, other text ~4 characters per token
+    cjk = sum(1 for char in text if '一' <= char <= '鿿')
+    return cjk + (len(text) - cjk) // 4 + 1
+
+
+def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    # Exact count with tiktoken when it is installed, the rough estimate otherwise
+    encoding = _encoding(model)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        # Unknown models (e.g. a ChatGLM endpoint) are counted with the GPT-3.5/4 encoding
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # The BPE files are downloaded on first use, fall back to the estimate when offline
+        return None
@@ -0,0 +1,139 @@
+"""
+Concurrent-user load test for the langchain translator servers.
+
+gradio_server.py and flask_server.py share one PDFTranslator between all requests. This
+benchmark does the same in-process: for every number of concurrent users, each user
+translates its own generated PDF through the shared translator against the local mock
+LLM server. It reports aggregate pages/sec, which should grow with the number of users
+until the mock server or the request pool saturates. It also checks that every output
+contains only its own user's text, so a leak of state between requests shows up as a
+failure instead of a fast number.
+
+Needs the langchain tree's requirements (langchain, langchain-openai, pdfplumber, reportlab).
+
+Usage (from the langchain/openai-translator directory):
+    python benchmarks/bench_concurrent_users.py [--users 1 2 4 8] [--pages 10] [--latency 0.2]
+        [--concurrency 4] [--output bench_concurrent_users.json]
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+LANGCHAIN_TREE = os.path.abspath(os.path.join(BENCH_DIR, ".."))
+# The mock OpenAI server is shared with the v1 tree's benchmarks
+MOCK_SERVER_DIR = os.path.abspath(os.path.join(BENCH_DIR, "..", "..", "..", "openai-translator", "benchmarks"))
+USER_MARKER = re.compile(r"reader\s+(\d+)\b")
+
+
+def make_user_pdf(output_file_path: str, user: int, pages: int):
+    from reportlab.lib import pagesizes
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, PageBreak
+
+    styles = getSampleStyleSheet()
+    story = []
+    for page_idx in range(pages):
+        # Every paragraph names its user, so outputs can be checked for text of other users
+        for paragraph_idx in range(3):
+            story.append(Paragraph(f"Notes of reader {user} on page {page_idx + 1}, paragraph {paragraph_idx + 1}. "
+                                   "The old man looked at the sea and waited for the fish.", styles["Normal"]))
+        story.append(PageBreak())
+    SimpleDocTemplate(output_file_path, pagesize=pagesizes.letter).build(story)
+
+
+def translate_as_user(translator, pdf_file_path: str, output_file_path: str, user: int) -> dict:
+    start = time.perf_counter()
+    translator.translate_pdf(pdf_file_path, "markdown", output_file_path=output_file_path)
+    elapsed = time.perf_counter() - start
+
+    with open(output_file_path, encoding="utf-8") as output_file:
+        users_seen = {int(found) for found in USER_MARKER.findall(output_file.read())}
+    return {"user": user, "seconds": elapsed, "isolated": users_seen == {user}}
+
+
+def run_level(translator, users: int, pages: int, work_dir: str) -> dict:
+    pdfs = []
+    for user in range(users):
+        pdf_file_path = os.path.join(work_dir, f"user_{users}_{user}.pdf")
+        make_user_pdf(pdf_file_path, user, pages)
+        pdfs.append(pdf_file_path)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        results = list(executor.map(
+            lambda user: translate_as_user(translator, pdfs[user], pdfs[user].replace(".pdf", "_out.md"), user),
+            range(users)))
+    wall = time.perf_counter() - start
+
+    return {
+        "users": users,
+        "pages": users * pages,
+        "wall_s": round(wall, 3),
+        "pages_per_s": round(users * pages / wall, 2),
+        "mean_user_s": round(sum(result["seconds"] for result in results) / users, 3),
+        "isolated": all(result["isolated"] for result in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-user load test of a shared PDFTranslator.")
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 2, 4, 8], help="Numbers of concurrent users to run.")
+    parser.add_argument("--pages", type=int, default=10, help="Pages per user PDF.")
+    parser.add_argument("--latency", type=float, default=0.2, help="Mock server latency per request in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Extra uniformly random latency in seconds.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight per translation.")
+    parser.add_argument("--output", type=str, default="bench_concurrent_users.json")
+    args = parser.parse_args()
+
+    sys.path.insert(0, MOCK_SERVER_DIR)
+    from mock_llm_server import start_server
+
+    server, url = start_server(latency=args.latency, jitter=args.jitter)
+    os.environ["OPENAI_API_KEY"] = "sk-mock"
+    os.environ["OPENAI_BASE_URL"] = url + "/v1"
+    os.environ["OPENAI_API_BASE"] = url + "/v1"
+
+    sys.path.insert(0, os.path.join(LANGCHAIN_TREE, "ai_translator"))
+    from translator import PDFTranslator
+
+    # One translator for all users, like the servers' global Translator
+    translator = PDFTranslator("gpt-3.5-turbo", concurrency=args.concurrency)
+    work_dir = tempfile.mkdtemp()
+
+    levels = []
+    for users in args.users:
+        server.reset_counters()
+        level = run_level(translator, users, args.pages, work_dir)
+        level["server"] = server.reset_counters()
+        levels.append(level)
+        print(json.dumps(level))
+
+    server.shutdown()
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    baseline = levels[0]["pages_per_s"]
+    for level in levels:
+        level["speedup"] = round(level["pages_per_s"] / baseline, 2) if baseline else None
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "settings": {"pages": args.pages, "latency": args.latency, "jitter": args.jitter, "concurrency": args.concurrency},
+        "levels": levels,
+    }
+    with open(args.output, "w", encoding="utf-8") as output_file:
+        json.dump(report, output_file, ensure_ascii=False, indent=2)
+    print(f"Results written to {args.output}")
+
+    if not all(level["isolated"] for level in levels):
+        sys.exit("Output of one user contained text of another user")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
 from .page import Page
 
 class Book:
+    __slots__ = ("pdf_file_path", "pages")
+
     def __init__(self, pdf_file_path):
         self.pdf_file_path = pdf_file_path
         self.pages = []
 
     def add_page(self, page: Page):
-        self.pages.append(page)
\ No newline at end of file
+        self.pages.append(page)
@@ -3,25 +3,102 @@ import os
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from utils import ArgumentParser, ConfigLoader, LOG
-from model import GLMModel, OpenAIModel
-from translator import PDFTranslator
+from utils import ArgumentParser
 
 if __name__ == "__main__":
     argument_parser = ArgumentParser()
     args = argument_parser.parse_arguments()
+
+    # 解析完命令行再导入其余模块，--help 等短命令不必加载模型、PDF 相关的重量级依赖
+    from utils import ConfigLoader, TranslationCache, LOG, METRICS
+    from model import RateLimiter
+    from translator import PDFTranslator
+
     config_loader = ConfigLoader(args.config)
 
     config = config_loader.load_config()
 
-    model_name = args.openai_model if args.openai_model else config['OpenAIModel']['model']
-    api_key = args.openai_api_key if args.openai_api_key else config['OpenAIModel']['api_key']
-    model = OpenAIModel(model=model_name, api_key=api_key)
+    rate_limiter = None
+    if args.model_type == "HedgedModel":
+        hedged_config = config['HedgedModel']
+        backends = []
+        # 同一账号、同一模型的副本共用一个限流器，额度按账号计算，不能每个副本各算一份
+        rate_limiters = {}
+        for backend in hedged_config['backends']:
+            # 后端可以是配置段的名字，也可以是只写出不同设置的副本，例如 {type: "GLMModel", model_url: ...}
+            if isinstance(backend, str):
+                backend = {'type': backend}
+            settings = {**config[backend['type']], **backend}
+            if backend['type'] == "GLMModel":
+                from model import GLMModel
+                backends.append(GLMModel(model_url=settings['model_url'], timeout=settings['timeout'], pool_size=settings['pool_size']))
+            else:
+                from model import OpenAIModel
+                account = (settings['api_key'], settings['model'])
+                if account not in rate_limiters:
+                    rate_limiters[account] = RateLimiter(settings['requests_per_minute'], settings['tokens_per_minute'])
+                # 失败立即交给 HedgedModel 切换后端，不在单个后端上重试退避；副本可以显式写出 max_attempts
+                backends.append(OpenAIModel(model=settings['model'], api_key=settings['api_key'],
+                                            rate_limiter=rate_limiters[account],
+                                            max_attempts=backend.get('max_attempts', 1)))
+        from model import HedgedModel
+        model = HedgedModel(backends, hedge_percentile=hedged_config['hedge_percentile'],
+                            initial_hedge_delay=hedged_config['initial_hedge_delay'], min_hedge_delay=hedged_config['min_hedge_delay'])
+    elif args.model_type == "GLMModel":
+        model_url = args.glm_model_url if args.glm_model_url else config['GLMModel']['model_url']
+        timeout = args.timeout if args.timeout else config['GLMModel']['timeout']
+        pool_size = args.glm_pool_size if args.glm_pool_size else config['GLMModel']['pool_size']
+        from model import GLMModel
+        model = GLMModel(model_url=model_url, timeout=timeout, pool_size=pool_size)
+    else:
+        model_name = args.openai_model if args.openai_model else config['OpenAIModel']['model']
+        api_key = args.openai_api_key if args.openai_api_key else config['OpenAIModel']['api_key']
+        # 所有并发请求共享同一个限流器
+        rate_limiter = RateLimiter(
+            requests_per_minute=config['OpenAIModel']['requests_per_minute'],
+            tokens_per_minute=config['OpenAIModel']['tokens_per_minute'])
+        from model import OpenAIModel
+        model = OpenAIModel(model=model_name, api_key=api_key, rate_limiter=rate_limiter,
+                            max_attempts=config['OpenAIModel']['max_attempts'])
+
+    cache_file = args.cache_file if args.cache_file else config['TranslationCache']['cache_file']
+    cache_size = args.cache_size if args.cache_size else config['TranslationCache']['cache_size']
+    cache_mode = args.cache_mode if args.cache_mode else config['TranslationCache']['cache_mode']
+    model.cache = TranslationCache(cache_file, max_entries=cache_size, mode=cache_mode)
 
 
     pdf_file_path = args.book if args.book else config['common']['book']
     file_format = args.file_format if args.file_format else config['common']['file_format']
+    concurrency = args.concurrency if args.concurrency else config['common']['concurrency']
+    parse_workers = args.parse_workers if args.parse_workers else config['common']['parse_workers']
+    checkpoint_dir = args.checkpoint_dir if args.checkpoint_dir else config['common']['checkpoint_dir']
+    pack_token_budget = args.pack_token_budget if args.pack_token_budget is not None else config['common']['pack_token_budget']
+    chunk_token_budget = args.chunk_token_budget if args.chunk_token_budget is not None else config['common']['chunk_token_budget']
+    dedup = args.dedup if args.dedup is not None else config['common']['dedup']
+    target_languages = args.target_language if args.target_language else config['common']['target_language']
+    if isinstance(target_languages, str):
+        target_languages = [target_languages]
 
     # 实例化 PDFTranslator 类，并调用 translate_pdf() 方法
-    translator = PDFTranslator(model)
-    translator.translate_pdf(pdf_file_path, file_format)
+    translator = PDFTranslator(model, concurrency=concurrency, pack_token_budget=pack_token_budget, parse_workers=parse_workers, checkpoint_dir=checkpoint_dir,
+                               chunk_token_budget=chunk_token_budget, dedup=dedup)
+    stream = args.stream or config['common']['stream']
+    if stream and len(target_languages) == 1:
+        stream_window = args.stream_window if args.stream_window else config['common']['stream_window']
+        translator.translate_pdf_streaming(pdf_file_path, file_format, target_languages[0], window=stream_window, resume=args.resume,
+                                           overwrite_checkpoint=args.overwrite_checkpoint)
+    else:
+        if stream:
+            LOG.warning("流式模式只支持单个目标语言，多语言改为一次解析、统一翻译")
+        translator.translate_pdf_languages(pdf_file_path, file_format, target_languages, resume=args.resume,
+                                           overwrite_checkpoint=args.overwrite_checkpoint)
+
+    if rate_limiter is not None:
+        LOG.info(f"Rate limiter: {rate_limiter.metrics()}")
+    if args.model_type == "HedgedModel":
+        LOG.info(f"Backends: {model.backend_stats()}")
+
+    metrics_report = args.metrics_report if args.metrics_report else config['common']['metrics_report']
+    if metrics_report:
+        METRICS.save_report(metrics_report)
+        LOG.info(f"Run report: {metrics_report}")
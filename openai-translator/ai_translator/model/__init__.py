@@ -1,3 +1,16 @@
 from .model import Model
-from .glm_model import GLMModel
-from .openai_model import OpenAIModel
\ No newline at end of file
+from .rate_limiter import RateLimiter
+
+
+def __getattr__(name):
+    # Backends pull in their HTTP clients (openai, requests, httpx), load them on first use
+    if name == "GLMModel":
+        from .glm_model import GLMModel
+        return GLMModel
+    if name == "HedgedModel":
+        from .hedged_model import HedgedModel
+        return HedgedModel
+    if name == "OpenAIModel":
+        from .openai_model import OpenAIModel
+        return OpenAIModel
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,30 +1,81 @@
+import httpx
 import requests
 import simplejson
+from requests.adapters import HTTPAdapter
 
 from model import Model
+from utils import METRICS, estimate_tokens
 
 class GLMModel(Model):
-    def __init__(self, model_url: str, timeout: int):
+    def __init__(self, model_url: str, timeout: int, pool_size: int = 10):
         self.model_url = model_url
+        self.model_name = model_url
         self.timeout = timeout
+        self.pool_size = pool_size
 
-    def make_request(self, prompt):
+        # Keep-alive connection pool shared by all worker threads, sized to the number of workers
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # Created lazily inside the running event loop
+        self._async_client = None
+
+    def make_payload(self, prompt):
+        return {
+            "prompt": prompt,
+            "history": []
+        }
+
+    def _make_request(self, prompt):
         try:
-            payload = {
-                "prompt": prompt,
-                "history": []
-            }
-            response = requests.post(self.model_url, json=payload, timeout=self.timeout)
+            response = self.session.post(self.model_url, json=self.make_payload(prompt), timeout=self.timeout)
             response.raise_for_status()
             response_dict = response.json()
             translation = response_dict["response"]
+            self._record_usage(prompt, translation)
             return translation, True
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"请求异常：{e}")
         except requests.exceptions.Timeout as e:
             raise Exception(f"请求超时：{e}")
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"请求异常：{e}")
         except simplejson.errors.JSONDecodeError as e:
             raise Exception("Error: response is not valid JSON format.")
         except Exception as e:
             raise Exception(f"发生了未知错误：{e}")
         return "", False
+
+    async def _amake_request(self, prompt):
+        if self._async_client is None:
+            limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            self._async_client = httpx.AsyncClient(timeout=self.timeout, limits=limits)
+
+        try:
+            response = await self._async_client.post(self.model_url, json=self.make_payload(prompt))
+            response.raise_for_status()
+            response_dict = response.json()
+            translation = response_dict["response"]
+            self._record_usage(prompt, translation)
+            return translation, True
+        except httpx.TimeoutException as e:
+            raise Exception(f"请求超时：{e}")
+        except httpx.HTTPError as e:
+            raise Exception(f"请求异常：{e}")
+        except ValueError as e:
+            raise Exception("Error: response is not valid JSON format.")
+        except Exception as e:
+            raise Exception(f"发生了未知错误：{e}")
+
+    def _record_usage(self, prompt, translation):
+        # The ChatGLM API does not report token usage, count estimated tokens instead
+        METRICS.increment("prompt_tokens", estimate_tokens(prompt))
+        METRICS.increment("completion_tokens", estimate_tokens(translation))
+
+    def close(self):
+        self.session.close()
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
@@ -0,0 +1,220 @@
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import List
+
+from model import Model
+from utils import LOG, METRICS
+
+
+class BackendStats:
+    # Sliding window of the recent successful latencies of one backend, plus its recent failures
+    def __init__(self, window: int = 200, failure_cooldown: float = 30.0):
+        self.latencies = deque(maxlen=window)
+        self.failure_cooldown = failure_cooldown
+        self.failures = 0
+        self.down_until = 0.0
+        self._lock = threading.Lock()
+
+    def record_success(self, seconds: float):
+        with self._lock:
+            self.latencies.append(seconds)
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            # Every failure in a row keeps the backend out of first place for longer
+            self.down_until = time.monotonic() + self.failure_cooldown * min(self.failures, 4)
+
+    def quantile(self, q: float):
+        with self._lock:
+            if not self.latencies:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+    def samples(self) -> int:
+        return len(self.latencies)
+
+    def is_down(self) -> bool:
+        return time.monotonic() < self.down_until
+
+
+class HedgedModel(Model):
+    """
+    Composite backend over several models (e.g. an OpenAIModel and a GLMModel, or replicas of one).
+
+    Every request goes to the backend with the lowest recent median latency. If it has not answered
+    after its hedge_percentile latency, the same request is sent to the next backend and the first
+    successful answer wins; the other request is cancelled (a blocking request that already started
+    is left to finish and ignored). A failed backend is failed over to the next one right away and
+    is ranked last for a cooldown.
+    """
+
+    def __init__(self, backends: List[Model], hedge_percentile: float = 0.95, initial_hedge_delay: float = 2.0,
+                 min_hedge_delay: float = 0.1, min_samples: int = 20, max_workers: int = 32):
+        if not backends:
+            raise ValueError("HedgedModel needs at least one backend")
+        self.backends = backends
+        self.model_name = "+".join(backend.model_name for backend in backends)
+        self.context_window = min(backend.context_window for backend in backends)
+        self.max_output_tokens = min(backend.max_output_tokens for backend in backends)
+        self.hedge_percentile = hedge_percentile
+        # Used until a backend has min_samples latencies to take the percentile of
+        self.initial_hedge_delay = initial_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.min_samples = min_samples
+        self.stats = [BackendStats() for _ in backends]
+        # Backend requests run here, the caller's thread only waits for the first answer
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def count_tokens(self, text: str) -> int:
+        return self.backends[0].count_tokens(text)
+
+    def _route(self) -> List[int]:
+        # Healthy backends first, then by median latency; backends without samples yet are tried early
+        def rank(idx):
+            median = self.stats[idx].quantile(0.5)
+            return self.stats[idx].is_down(), median if median is not None else 0.0, idx
+        return sorted(range(len(self.backends)), key=rank)
+
+    def _hedge_delay(self, idx: int) -> float:
+        stats = self.stats[idx]
+        if stats.samples() < self.min_samples:
+            return self.initial_hedge_delay
+        return max(self.min_hedge_delay, stats.quantile(self.hedge_percentile))
+
+    def _make_request(self, prompt):
+        order = self._route()
+        in_flight, errors = {}, []
+        hedged = False
+
+        def launch():
+            idx = order[len(in_flight) + len(errors)]
+            in_flight[self._executor.submit(self._call, idx, prompt)] = idx
+
+        launch()
+        hedge_at = time.monotonic() + self._hedge_delay(order[0])
+        while in_flight:
+            can_hedge = not hedged and len(in_flight) + len(errors) < len(order)
+            timeout = max(0.0, hedge_at - time.monotonic()) if can_hedge else None
+            done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                # The first backend is slower than usual, race it against the next one
+                hedged = True
+                METRICS.increment("hedged_requests")
+                launch()
+                continue
+
+            for future in done:
+                idx = in_flight.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    LOG.warning(f"Backend {self.backends[idx].model_name} failed: {e}")
+                    if len(in_flight) + len(errors) < len(order):
+                        METRICS.increment("failovers")
+                        launch()
+                    continue
+
+                # Blocking clients cannot be interrupted, a started loser finishes in the background and is ignored
+                for loser in in_flight:
+                    loser.cancel()
+                if idx != order[0]:
+                    METRICS.increment("hedge_wins")
+                return result
+
+        raise Exception(f"All {len(order)} backends failed, last error: {errors[-1]}")
+
+    async def _amake_request(self, prompt):
+        order = self._route()
+        in_flight, errors = {}, []
+        hedged = False
+
+        def launch():
+            idx = order[len(in_flight) + len(errors)]
+            in_flight[asyncio.ensure_future(self._acall(idx, prompt))] = idx
+
+        launch()
+        hedge_at = time.monotonic() + self._hedge_delay(order[0])
+        try:
+            while in_flight:
+                can_hedge = not hedged and len(in_flight) + len(errors) < len(order)
+                timeout = max(0.0, hedge_at - time.monotonic()) if can_hedge else None
+                done, _ = await asyncio.wait(in_flight, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    hedged = True
+                    METRICS.increment("hedged_requests")
+                    launch()
+                    continue
+
+                for task in done:
+                    idx = in_flight.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        errors.append(e)
+                        LOG.warning(f"Backend {self.backends[idx].model_name} failed: {e}")
+                        if len(in_flight) + len(errors) < len(order):
+                            METRICS.increment("failovers")
+                            launch()
+                        continue
+
+                    if idx != order[0]:
+                        METRICS.increment("hedge_wins")
+                    return result
+        finally:
+            # Cancels the losing request, also when the caller itself is cancelled
+            for task in in_flight:
+                task.cancel()
+
+        raise Exception(f"All {len(order)} backends failed, last error: {errors[-1]}")
+
+    def _call(self, idx: int, prompt):
+        start = time.perf_counter()
+        try:
+            result = self.backends[idx]._make_request(prompt)
+        except Exception:
+            self.stats[idx].record_failure()
+            raise
+        self._record_latency(idx, time.perf_counter() - start)
+        return result
+
+    async def _acall(self, idx: int, prompt):
+        start = time.perf_counter()
+        try:
+            result = await self.backends[idx]._amake_request(prompt)
+        except asyncio.CancelledError:
+            # Lost the race, not a failure of the backend
+            raise
+        except Exception:
+            self.stats[idx].record_failure()
+            raise
+        self._record_latency(idx, time.perf_counter() - start)
+        return result
+
+    def _record_latency(self, idx: int, seconds: float):
+        self.stats[idx].record_success(seconds)
+        METRICS.observe(f"backend_{idx}_latency_seconds", seconds)
+
+    def backend_stats(self) -> List[dict]:
+        return [
+            {
+                "backend": backend.model_name,
+                "samples": stats.samples(),
+                "p50_s": stats.quantile(0.5),
+                "hedge_delay_s": self._hedge_delay(idx),
+                "down": stats.is_down(),
+            }
+            for idx, (backend, stats) in enumerate(zip(self.backends, self.stats))
+        ]
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
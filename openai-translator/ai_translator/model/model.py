@@ -1,17 +1,94 @@
+import asyncio
+import time
+from typing import Callable
+
 from book import ContentType
+from utils import METRICS, count_tokens
 
 class Model:
+    # Optional TranslationCache, checked before every backend request
+    cache = None
+    # Token limits of the backend, used to size chunks and completions
+    context_window = 4096
+    max_output_tokens = 4096
+
+    def count_tokens(self, text: str) -> int:
+        return count_tokens(text, self.model_name)
+
+    def chunk_token_budget(self) -> int:
+        # Leave room for the instructions and for a translation that comes out longer than the source
+        return min(self.context_window // 3, self.max_output_tokens // 2)
+
     def make_text_prompt(self, text: str, target_language: str) -> str:
         return f"翻译为{target_language}：{text}"
 
-    def make_table_prompt(self, table: str, target_language: str) -> str:
-        return f"翻译为{target_language}，保持间距（空格，分隔符），以表格形式返回：\n{table}"
+    def make_table_prompt(self, cells: str, target_language: str) -> str:
+        return f"翻译为{target_language}，下面是表格单元格组成的 JSON 数组，逐项翻译，只返回长度和顺序都不变的 JSON 数组：\n{cells}"
+
+    def make_packed_prompt(self, packed_text: str, target_language: str) -> str:
+        return f"翻译为{target_language}，保留每段开头的 <<<编号>>> 标记，不要合并、拆分或省略任何一段：\n{packed_text}"
 
     def translate_prompt(self, content, target_language: str) -> str:
         if content.content_type == ContentType.TEXT:
             return self.make_text_prompt(content.original, target_language)
         elif content.content_type == ContentType.TABLE:
-            return self.make_table_prompt(content.get_original_as_str(), target_language)
+            return self.make_table_prompt(content.get_cells_as_json(), target_language)
+
+    def make_request(self, prompt, accept: Callable[[str], bool] = None):
+        # accept(translation), if given, decides whether a reply may be cached or served from the cache,
+        # e.g. a packed reply that cannot be split back into its segments
+        key = None
+        if self.cache is not None:
+            # The prompt already carries the target language, the model name completes the key
+            key = self.cache.make_key(prompt, self.model_name)
+            translation = self.cache.get(key)
+            if translation is not None and (accept is None or accept(translation)):
+                METRICS.increment("cache_hits")
+                return translation, True
+            METRICS.increment("cache_misses")
+
+        METRICS.increment("requests")
+        start = time.perf_counter()
+        try:
+            translation, status = self._make_request(prompt)
+        except Exception:
+            METRICS.increment("request_failures")
+            raise
+        finally:
+            METRICS.observe("request_latency_seconds", time.perf_counter() - start)
+
+        if key is not None and status and (accept is None or accept(translation)):
+            self.cache.put(key, translation)
+        return translation, status
+
+    async def amake_request(self, prompt, accept: Callable[[str], bool] = None):
+        # Async counterpart of make_request, lets many requests be in flight on one event loop
+        key = None
+        if self.cache is not None:
+            key = self.cache.make_key(prompt, self.model_name)
+            translation = self.cache.get(key)
+            if translation is not None and (accept is None or accept(translation)):
+                METRICS.increment("cache_hits")
+                return translation, True
+            METRICS.increment("cache_misses")
+
+        METRICS.increment("requests")
+        start = time.perf_counter()
+        try:
+            translation, status = await self._amake_request(prompt)
+        except Exception:
+            METRICS.increment("request_failures")
+            raise
+        finally:
+            METRICS.observe("request_latency_seconds", time.perf_counter() - start)
+
+        if key is not None and status and (accept is None or accept(translation)):
+            self.cache.put(key, translation)
+        return translation, status
+
+    def _make_request(self, prompt):
+        raise NotImplementedError("子类必须实现 _make_request 方法")
 
-    def make_request(self, prompt):
-        raise NotImplementedError("子类必须实现 make_request 方法")
+    async def _amake_request(self, prompt):
+        # Backends without a native async client run the blocking request in a worker thread
+        return await asyncio.to_thread(self._make_request, prompt)
@@ -1,54 +1,152 @@
-import requests
-import simplejson
+import random
 import time
 import os
 import openai
 
 from model import Model
-from utils import LOG
+from model.rate_limiter import RateLimiter
+from utils import LOG, METRICS
 from openai import OpenAI
 
+# (context window, maximum completion tokens), the longest matching prefix wins
+MODEL_TOKEN_LIMITS = {
+    "gpt-3.5-turbo": (16385, 4096),
+    "gpt-3.5-turbo-instruct": (4096, 4096),
+    "gpt-4": (8192, 8192),
+    "gpt-4-32k": (32768, 32768),
+    "gpt-4-turbo": (128000, 4096),
+    "gpt-4o": (128000, 4096),
+}
+
 class OpenAIModel(Model):
-    def __init__(self, model: str, api_key: str):
+    def __init__(self, model: str, api_key: str, rate_limiter: RateLimiter = None, max_attempts: int = 5,
+                 base_backoff: float = 1.0, max_backoff: float = 60.0):
         self.model = model
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.model_name = model
+        # Retries are handled below so that they go through the shared rate limiter
+        # The key of this instance, so replicas on different accounts really use their own; the environment as fallback
+        self.client = OpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"), max_retries=0)
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.context_window, self.max_output_tokens = _token_limits(model)
+
+    def _make_request(self, prompt):
+        prompt_tokens = self.count_tokens(prompt)
+        max_tokens = self._completion_budget(prompt_tokens)
+        # OpenAI charges max_tokens against the TPM quota up front, reserve the same
+        tokens = prompt_tokens + max_tokens
 
-    def make_request(self, prompt):
-        attempts = 0
-        while attempts < 3:
+        for attempt in range(self.max_attempts):
+            self.rate_limiter.acquire(tokens)
             try:
                 if self.model == "gpt-3.5-turbo":
                     response = self.client.chat.completions.create(
                         model=self.model,
                         messages=[
                             {"role": "user", "content": prompt}
-                        ]
+                        ],
+                        max_tokens=max_tokens
                     )
                     translation = response.choices[0].message.content.strip()
                 else:
                     response = self.client.completions.create(
                         model=self.model,
                         prompt=prompt,
-                        max_tokens=150,
+                        max_tokens=max_tokens,
                         temperature=0
                     )
                     translation = response.choices[0].text.strip()
 
+                self._record_usage(response)
+                self.rate_limiter.on_success()
+                if response.choices[0].finish_reason == "length":
+                    # A cut-off translation must not be cached or journaled as final: retry once with
+                    # everything the context window allows, otherwise report the segment as failed
+                    ceiling = self._completion_ceiling(prompt_tokens)
+                    if max_tokens < ceiling and attempt + 1 < self.max_attempts:
+                        LOG.warning(f"Translation was cut off at max_tokens={max_tokens}, retrying with max_tokens={ceiling}")
+                        METRICS.increment("retries")
+                        max_tokens, tokens = ceiling, prompt_tokens + ceiling
+                        continue
+                    LOG.warning(f"Translation was cut off at max_tokens={max_tokens}")
+                    METRICS.increment("truncated_completions")
+                    return translation, False
                 return translation, True
             except openai.RateLimitError as e:
-                attempts += 1
-                if attempts < 3:
-                    LOG.warning("Rate limit reached. Waiting for 60 seconds before retrying.")
-                    time.sleep(60)
-                else:
-                    raise Exception("Rate limit reached. Maximum attempts exceeded.")
+                delay = self._backoff(attempt, e)
+                # Every worker waits in acquire() until the pause is over
+                self.rate_limiter.on_rate_limited(delay)
+                METRICS.increment("rate_limited")
+                self._raise_if_last(attempt, e)
+                LOG.warning(f"Rate limit reached. Pausing all requests for {delay:.1f} seconds before retrying.")
+                METRICS.increment("retries")
             except openai.APIConnectionError as e:
-                print("The server could not be reached")
-                print(e.__cause__)  # an underlying Exception, likely raised within httpx.            except requests.exceptions.Timeout as e:
+                # No pause after the last attempt, e.g. HedgedModel fails over to the next backend right away
+                self._raise_if_last(attempt, e)
+                delay = self._backoff(attempt, e)
+                LOG.warning(f"The server could not be reached ({e.__cause__}). Retrying in {delay:.1f} seconds.")
+                METRICS.increment("retries")
+                time.sleep(delay)
             except openai.APIStatusError as e:
-                print("Another non-200-range status code was received")
-                print(e.status_code)
-                print(e.response)
+                if e.status_code < 500:
+                    raise Exception(f"请求失败，状态码 {e.status_code}：{e.message}")
+                self._raise_if_last(attempt, e)
+                delay = self._backoff(attempt, e)
+                LOG.warning(f"Server error {e.status_code}. Retrying in {delay:.1f} seconds.")
+                METRICS.increment("retries")
+                time.sleep(delay)
             except Exception as e:
                 raise Exception(f"发生了未知错误：{e}")
-        return "", False
+
+        raise Exception(f"Request failed after {self.max_attempts} attempts.")
+
+    def _raise_if_last(self, attempt: int, error):
+        if attempt + 1 >= self.max_attempts:
+            raise Exception(f"Request failed after {self.max_attempts} attempts: {error}") from error
+
+    def _completion_budget(self, prompt_tokens: int) -> int:
+        # A translation is about as long as its source, twice that plus some slack is plenty;
+        # it must also fit in what the context window has left after the prompt and the message framing
+        return max(1, min(self._completion_ceiling(prompt_tokens), prompt_tokens * 2 + 64))
+
+    def _completion_ceiling(self, prompt_tokens: int) -> int:
+        return max(1, min(self.max_output_tokens, self.context_window - prompt_tokens - 16))
+
+    def _record_usage(self, response):
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        METRICS.increment("prompt_tokens", usage.prompt_tokens)
+        METRICS.increment("completion_tokens", usage.completion_tokens)
+
+    def _backoff(self, attempt: int, error) -> float:
+        # Full-jitter exponential backoff, but never shorter than the server's Retry-After
+        delay = random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+        retry_after = _retry_after_seconds(error)
+        return max(delay, retry_after) if retry_after is not None else delay
+
+
+def _retry_after_seconds(error):
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+
+    headers = response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        # Retry-After may also be an HTTP date, fall back to the computed backoff
+        return None
+    return None
+
+
+def _token_limits(model: str):
+    for prefix in sorted(MODEL_TOKEN_LIMITS, key=len, reverse=True):
+        if model.startswith(prefix):
+            return MODEL_TOKEN_LIMITS[prefix]
+    return Model.context_window, Model.max_output_tokens
@@ -0,0 +1,88 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute token buckets shared by every worker thread.
+
+    A 429 pauses all callers until its Retry-After has passed and scales the refill rate
+    down; every success scales it back up, so throughput settles just under the quota.
+    """
+
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0, burst_seconds: float = 6.0):
+        # A limit of 0 disables that bucket
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._request_capacity = max(1.0, requests_per_minute * burst_seconds / 60)
+        self._token_capacity = max(1.0, tokens_per_minute * burst_seconds / 60)
+        self._requests = self._request_capacity
+        self._tokens = self._token_capacity
+        self._scale = 1.0
+        self._blocked_until = 0.0
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+        self.throttled_seconds = 0.0
+        self.throttled_requests = 0
+        self.rate_limited = 0
+
+    def acquire(self, tokens: int = 0) -> float:
+        # Block until both buckets can serve the request, return the time spent waiting
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                delay = self._blocked_until - now
+
+                if delay <= 0:
+                    # A prompt larger than the bucket only needs a full bucket, the balance goes negative
+                    needed_tokens = min(tokens, self._token_capacity)
+                    if (not self.requests_per_minute or self._requests >= 1) and \
+                            (not self.tokens_per_minute or self._tokens >= needed_tokens):
+                        self._requests -= 1
+                        self._tokens -= tokens
+                        if waited:
+                            self.throttled_seconds += waited
+                            self.throttled_requests += 1
+                        return waited
+
+                    delay = max(
+                        (1 - self._requests) / self._rate(self.requests_per_minute) if self.requests_per_minute else 0,
+                        (needed_tokens - self._tokens) / self._rate(self.tokens_per_minute) if self.tokens_per_minute else 0,
+                        0.01,
+                    )
+
+            time.sleep(delay)
+            waited += delay
+
+    def on_rate_limited(self, retry_after: float):
+        with self._lock:
+            self.rate_limited += 1
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+            self._scale = max(0.1, self._scale * 0.8)
+
+    def on_success(self):
+        with self._lock:
+            self._scale = min(1.0, self._scale + 0.02)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "throttled_seconds": round(self.throttled_seconds, 3),
+                "throttled_requests": self.throttled_requests,
+                "rate_limited": self.rate_limited,
+                "rate_scale": round(self._scale, 3),
+            }
+
+    def _rate(self, per_minute: int) -> float:
+        return per_minute * self._scale / 60
+
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        if self.requests_per_minute:
+            self._requests = min(self._request_capacity, self._requests + elapsed * self._rate(self.requests_per_minute))
+        if self.tokens_per_minute:
+            self._tokens = min(self._token_capacity, self._tokens + elapsed * self._rate(self.tokens_per_minute))
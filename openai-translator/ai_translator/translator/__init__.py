@@ -1 +1,6 @@
-from .pdf_translator import PDFTranslator
\ No newline at end of file
+def __getattr__(name):
+    # PDFTranslator pulls in pdfplumber, load it on first use
+    if name == "PDFTranslator":
+        from .pdf_translator import PDFTranslator
+        return PDFTranslator
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
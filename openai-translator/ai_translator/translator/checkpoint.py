@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Optional, Tuple
+from book import Content, ContentType
+from translator.exceptions import CheckpointExistsException
+from utils import LOG
+
+
+class TranslationJournal:
+    # Append-only JSON-lines log of finished segment translations, one file per book.
+    # It is removed when the run completes without failed segments, so a journal left on disk
+    # always belongs to an unfinished run and is only truncated when overwrite is given
+    def __init__(self, pdf_file_path: str, target_language: str, checkpoint_dir: str = "checkpoints", resume: bool = False,
+                 overwrite: bool = False):
+        self.book_hash = self._hash_file(pdf_file_path)
+        self.target_language = target_language
+        # One journal per book and language, so several languages of a book can be translated at once
+        language_hash = hashlib.sha256(target_language.encode('utf-8')).hexdigest()[:8]
+        self.journal_path = os.path.join(checkpoint_dir, f"{self.book_hash}_{language_hash}.jsonl")
+        self.translations = {}
+        self.complete = False
+        self._lock = threading.Lock()
+
+        if not os.path.exists(checkpoint_dir):
+            os.makedirs(checkpoint_dir)
+
+        if resume:
+            self._load()
+            LOG.info(f"Resuming from {self.journal_path}: {len(self.translations)} segments already translated")
+            self._journal_file = open(self.journal_path, 'a', encoding='utf-8')
+            if self._journal_file.tell() and not self._ends_with_newline():
+                # Terminate a torn last line so the next record starts on a line of its own
+                self._journal_file.write('\n')
+        else:
+            if not overwrite and os.path.exists(self.journal_path) and os.path.getsize(self.journal_path):
+                raise CheckpointExistsException(self.journal_path)
+            self._journal_file = open(self.journal_path, 'w', encoding='utf-8')
+
+    @staticmethod
+    def _hash_file(pdf_file_path: str) -> str:
+        digest = hashlib.sha256()
+        with open(pdf_file_path, 'rb') as pdf_file:
+            for chunk in iter(lambda: pdf_file.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.journal_path, 'rb') as journal_file:
+            journal_file.seek(-1, os.SEEK_END)
+            return journal_file.read(1) == b'\n'
+
+    def _load(self):
+        if not os.path.exists(self.journal_path):
+            return
+
+        with open(self.journal_path, 'r', encoding='utf-8') as journal_file:
+            for line in journal_file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last line may be cut short by the crash we are resuming from
+                    continue
+                if record["target_language"] == self.target_language and "source" in record:
+                    self.translations[(record["page"], record["content"])] = (record["source"], record["translation"])
+
+    def get(self, position: Tuple[int, int], content: Content) -> Optional[str]:
+        # Positions move with the running-line split, so a record only counts if its source text matches
+        source, translation = self.translations.get(position, (None, None))
+        if source != _source_hash(content):
+            return None
+        return translation
+
+    def record(self, position: Tuple[int, int], content: Content, translation: str):
+        page_idx, content_idx = position
+        line = json.dumps({
+            "page": page_idx,
+            "content": content_idx,
+            "source": _source_hash(content),
+            "target_language": self.target_language,
+            "translation": translation,
+        }, ensure_ascii=False)
+
+        with self._lock:
+            self._journal_file.write(line + '\n')
+            self._journal_file.flush()
+
+    def mark_complete(self):
+        # Every segment is translated and written, the journal is not needed anymore
+        self.complete = True
+
+    def close(self):
+        with self._lock:
+            self._journal_file.close()
+        if self.complete:
+            os.remove(self.journal_path)
+            LOG.debug(f"Removed finished checkpoint journal {self.journal_path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            # Keep the journal of an interrupted run for --resume
+            self.complete = False
+        self.close()
+
+
+def _source_hash(content: Content) -> str:
+    source = content.get_original_as_str() if content.content_type == ContentType.TABLE else content.original
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()[:16]
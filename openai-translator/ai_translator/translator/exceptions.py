@@ -3,3 +3,10 @@ class PageOutOfRangeException(Exception):
         self.book_pages = book_pages
         self.requested_pages = requested_pages
         super().__init__(f"Page out of range: Book has {book_pages} pages, but {requested_pages} pages were requested.")
+
+
+class CheckpointExistsException(Exception):
+    def __init__(self, journal_path):
+        self.journal_path = journal_path
+        super().__init__(f"Checkpoint journal {journal_path} holds an unfinished translation: "
+                         f"continue it with --resume or discard it with --overwrite_checkpoint.")
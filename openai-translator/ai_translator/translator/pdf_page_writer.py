@@ -0,0 +1,116 @@
+import os
+import time
+from functools import lru_cache
+from reportlab.lib import colors, pagesizes
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import (
+    SimpleDocTemplate, Paragraph, Table, TableStyle, PageBreak, Frame, PageTemplate
+)
+
+from book import Page, ContentType
+from translator.writer import remove_partial_file
+from utils import LOG, METRICS
+
+class PDFPageWriter:
+    def __init__(self, output_file_path: str):
+        self.output_file_path = output_file_path
+        self.page_count = 0
+        self.simsun_style = _simsun_style()
+        self.start_time = time.perf_counter()
+
+        # The PDF is saved under a temporary name and renamed when complete, a failed run
+        # leaves no truncated file behind and does not replace an earlier good one
+        self.partial_file_path = output_file_path + ".part"
+        self.doc = SimpleDocTemplate(self.partial_file_path, pagesize=pagesizes.letter, pageCompression=1)
+        frame = Frame(self.doc.leftMargin, self.doc.bottomMargin, self.doc.width, self.doc.height, id='normal')
+        self.doc.addPageTemplates([PageTemplate(id='Later', frames=frame, pagesize=self.doc.pagesize)])
+
+        # Drive the platypus build loop by hand (what BaseDocTemplate.build does internally),
+        # so each page's flowables are laid out and released as soon as the page arrives
+        # instead of holding one story list for the whole book
+        self.doc._startBuild()
+        self.doc.canv._doctemplate = self.doc
+
+    def write_page(self, page: Page):
+        # Add a page break between pages
+        flowables = [PageBreak()] if self.page_count else []
+        for content in page.contents:
+            flowables.extend(_content_flowables(content, self.simsun_style))
+
+        with METRICS.stage("write"):
+            while flowables:
+                self.doc.clean_hanging()
+                self.doc.handle_flowable(flowables)
+        METRICS.increment("pages_written")
+        self.page_count += 1
+
+    def close(self):
+        with METRICS.stage("write"):
+            del self.doc.canv._doctemplate
+            self.doc._endBuild()
+        os.replace(self.partial_file_path, self.output_file_path)
+
+        elapsed = time.perf_counter() - self.start_time
+        LOG.info(f"PDF 导出: {self.page_count} 页，用时 {elapsed:.2f}s（{self.page_count / elapsed if elapsed else 0:.1f} 页/秒）")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def abort(self):
+        # Drop the document without _endBuild, which would save the pages so far as if complete
+        del self.doc.canv._doctemplate
+        self.doc = None
+        remove_partial_file(self.partial_file_path)
+        LOG.warning(f"PDF 导出中断，已写入 {self.page_count} 页未保存: {self.output_file_path}")
+
+
+@lru_cache(maxsize=None)
+def _simsun_style():
+    # Register Chinese font, once per process
+    font_path = "../fonts/simsun.ttc"  # 请将此路径替换为您的字体文件路径
+    pdfmetrics.registerFont(TTFont("SimSun", font_path))
+
+    # Create a new ParagraphStyle with the SimSun font
+    return ParagraphStyle('SimSun', fontName='SimSun', fontSize=12, leading=14)
+
+
+@lru_cache(maxsize=None)
+def _table_style():
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'SimSun'),  # 更改表头字体为 "SimSun"
+        ('FONTSIZE', (0, 0), (-1, 0), 14),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('FONTNAME', (0, 1), (-1, -1), 'SimSun'),  # 更改表格中的字体为 "SimSun"
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+
+
+def _content_flowables(content, simsun_style):
+    if not content.status:
+        return []
+
+    if content.content_type == ContentType.TEXT:
+        # Add translated text to the PDF
+        text = content.translation
+        return [Paragraph(text, simsun_style)]
+
+    elif content.content_type == ContentType.TABLE:
+        # Add table to the PDF
+        # The first translated row is the header, only the body rows are rendered
+        pdf_table = Table([list(row) for row in content.translation[1:]])
+        pdf_table.setStyle(_table_style())
+        return [pdf_table]
+
+    return []
@@ -1,58 +1,186 @@
+import math
 import pdfplumber
-from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
 from book import Book, Page, Content, ContentType, TableContent
 from translator.exceptions import PageOutOfRangeException
-from utils import LOG
+from utils import LOG, METRICS
+
+
+# None: every page; an int: the first N pages; a string of 1-based ranges such as "1-100,250,300-": those pages;
+# any other iterable: 0-based page indices
+PageSelection = Optional[Union[int, str, Iterable[int]]]
 
 
 class PDFParser:
-    def __init__(self):
-        pass
+    def __init__(self, workers: int = 1):
+        # workers > 1 parses page ranges in a process pool (text/table extraction is CPU-bound)
+        self.workers = max(1, workers)
 
-    def parse_pdf(self, pdf_file_path: str, pages: Optional[int] = None) -> Book:
+    def parse_pdf(self, pdf_file_path: str, pages: PageSelection = None) -> Book:
         book = Book(pdf_file_path)
 
+        for page in self.iter_pages(pdf_file_path, pages):
+            book.add_page(page)
+
+        return book
+
+    def page_count(self, pdf_file_path: str) -> int:
+        with pdfplumber.open(pdf_file_path) as pdf:
+            return len(pdf.pages)
+
+    def page_indices(self, pdf_file_path: str, pages: PageSelection = None) -> List[int]:
+        # The 0-based indices of the selected pages, in page order
         with pdfplumber.open(pdf_file_path) as pdf:
-            if pages is not None and pages > len(pdf.pages):
-                raise PageOutOfRangeException(len(pdf.pages), pages)
+            return _select_pages(pages, len(pdf.pages))
+
+    def iter_pages(self, pdf_file_path: str, pages: PageSelection = None) -> Iterator[Page]:
+        if self.workers > 1:
+            yield from self._iter_pages_parallel(pdf_file_path, pages)
+            return
+
+        with pdfplumber.open(pdf_file_path) as pdf:
+            for page_idx in _select_pages(pages, len(pdf.pages)):
+                pdf_page = pdf.pages[page_idx]
+                with METRICS.stage("parse"):
+                    page = _parse_page(pdf_page)
+                    # Drop pdfplumber's cached layout objects so memory stays flat on long books
+                    pdf_page.flush_cache()
+                METRICS.increment("pages_parsed")
+                yield page
+
+    def _iter_pages_parallel(self, pdf_file_path: str, pages: PageSelection = None) -> Iterator[Page]:
+        page_indices = self.page_indices(pdf_file_path, pages)
+
+        # Several ranges per worker keeps the pool balanced when some pages are much heavier
+        range_size = max(1, math.ceil(len(page_indices) / (self.workers * 4)))
+        page_ranges = _contiguous_ranges(page_indices, range_size)
+        LOG.debug(f"Parsing {len(page_indices)} pages in {len(page_ranges)} ranges with {self.workers} processes")
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            # map() yields the ranges back in submission order, i.e. page order
+            results = executor.map(
+                _parse_page_range,
+                [pdf_file_path] * len(page_ranges),
+                [start for start, _ in page_ranges],
+                [end for _, end in page_ranges],
+            )
+            while True:
+                # Only the time spent waiting on the workers counts, not the consumer's time between pages
+                with METRICS.stage("parse"):
+                    range_pages = next(results, None)
+                if range_pages is None:
+                    break
+                METRICS.increment("pages_parsed", len(range_pages))
+                yield from range_pages
 
-            if pages is None:
-                pages_to_parse = pdf.pages
+
+def _select_pages(pages: PageSelection, page_count: int) -> List[int]:
+    if pages is None:
+        return list(range(page_count))
+    if isinstance(pages, int):
+        if pages > page_count:
+            raise PageOutOfRangeException(page_count, pages)
+        return list(range(pages))
+
+    page_indices = _parse_page_ranges(pages, page_count) if isinstance(pages, str) else list(pages)
+    out_of_range = [page_idx for page_idx in page_indices if not 0 <= page_idx < page_count]
+    if out_of_range:
+        raise PageOutOfRangeException(page_count, max(out_of_range) + 1)
+    return sorted(set(page_indices))
+
+
+def _parse_page_ranges(spec: str, page_count: int) -> List[int]:
+    # "1-100,250,300-" -> 0-based indices; an open end runs to the last page
+    page_indices = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if "-" in part:
+                first, last = part.split("-", 1)
+                start = int(first) if first.strip() else 1
+                end = int(last) if last.strip() else page_count
             else:
-                pages_to_parse = pdf.pages[:pages]
+                start = end = int(part)
+        except ValueError:
+            raise ValueError(f"Invalid page range: {part!r}") from None
+        if start < 1 or end < start:
+            raise ValueError(f"Invalid page range: {part!r}")
+        page_indices.extend(range(start - 1, end))
+    return page_indices
 
-            for pdf_page in pages_to_parse:
-                page = Page()
 
-                # Store the original text content
-                raw_text = pdf_page.extract_text()
-                tables = pdf_page.extract_tables()
+def _contiguous_ranges(page_indices: List[int], max_size: int) -> List[Tuple[int, int]]:
+    # Sorted page indices -> (start, end) ranges of consecutive pages, at most max_size pages each
+    page_ranges = []
+    for page_idx in page_indices:
+        if page_ranges and page_ranges[-1][1] == page_idx and page_ranges[-1][1] - page_ranges[-1][0] < max_size:
+            page_ranges[-1][1] += 1
+        else:
+            page_ranges.append([page_idx, page_idx + 1])
+    return [(start, end) for start, end in page_ranges]
 
-                # Remove each cell's content from the original text
-                for table_data in tables:
-                    for row in table_data:
-                        for cell in row:
-                            raw_text = raw_text.replace(cell, "", 1)
 
-                # Handling text
-                if raw_text:
-                    # Remove empty lines and leading/trailing whitespaces
-                    raw_text_lines = raw_text.splitlines()
-                    cleaned_raw_text_lines = [line.strip() for line in raw_text_lines if line.strip()]
-                    cleaned_raw_text = "\n".join(cleaned_raw_text_lines)
+def _parse_page_range(pdf_file_path: str, start: int, end: int) -> List[Page]:
+    # Runs in a worker process, every worker opens its own handle on the PDF
+    parsed_pages = []
+    with pdfplumber.open(pdf_file_path) as pdf:
+        for pdf_page in pdf.pages[start:end]:
+            parsed_pages.append(_parse_page(pdf_page))
+            pdf_page.flush_cache()
+    return parsed_pages
 
-                    text_content = Content(content_type=ContentType.TEXT, original=cleaned_raw_text)
-                    page.add_content(text_content)
-                    LOG.debug(f"[raw_text]\n {cleaned_raw_text}")
 
+def _extract_text_and_tables(pdf_page):
+    found_tables = pdf_page.find_tables()
+    tables = [table.extract() for table in found_tables]
 
+    # Keep table cells out of the text by dropping the chars inside the table bounding boxes,
+    # one filter pass over the page objects instead of a str.replace per cell
+    if found_tables:
+        text_page = pdf_page.filter(_outside_bboxes([table.bbox for table in found_tables]))
+    else:
+        text_page = pdf_page
 
-                # Handling tables
-                if tables:
-                    table = TableContent(tables)
-                    page.add_content(table)
-                    LOG.debug(f"[table]\n{table}")
+    return text_page.extract_text(), tables
 
-                book.add_page(page)
 
-        return book
+def _outside_bboxes(bboxes):
+    def test(obj) -> bool:
+        if obj.get("object_type") != "char":
+            return True
+        x = (obj["x0"] + obj["x1"]) / 2
+        y = (obj["top"] + obj["bottom"]) / 2
+        return not any(x0 <= x <= x1 and top <= y <= bottom for x0, top, x1, bottom in bboxes)
+
+    return test
+
+
+def _parse_page(pdf_page) -> Page:
+    page = Page()
+
+    # Store the original text content, without the table cells
+    raw_text, tables = _extract_text_and_tables(pdf_page)
+
+    # Handling text
+    if raw_text:
+        # Remove empty lines and leading/trailing whitespaces
+        raw_text_lines = raw_text.splitlines()
+        cleaned_raw_text_lines = [line.strip() for line in raw_text_lines if line.strip()]
+        cleaned_raw_text = "\n".join(cleaned_raw_text_lines)
+
+        text_content = Content(content_type=ContentType.TEXT, original=cleaned_raw_text)
+        page.add_content(text_content)
+        LOG.debug(f"[raw_text]\n {cleaned_raw_text}")
+
+    # Handling tables, one content per table so every grid keeps its own rows and columns
+    for rows in tables:
+        if not rows:
+            continue
+        table = TableContent(rows)
+        page.add_content(table)
+        LOG.debug(f"[table]\n{table}")
+
+    return page
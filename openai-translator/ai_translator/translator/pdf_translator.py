@@ -1,26 +1,271 @@
-from typing import Optional
+import copy
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from typing import Dict, List, Optional
+from book import ContentType
 from model import Model
-from translator.pdf_parser import PDFParser
+from translator.checkpoint import TranslationJournal
+from translator.deduplicator import SegmentDeduplicator
+from translator.pdf_parser import PDFParser, PageSelection
+from translator.request_packer import RequestPacker
+from translator.text_chunker import TextChunker
 from translator.writer import Writer
-from utils import LOG
+from utils import LOG, METRICS
 
 class PDFTranslator:
-    def __init__(self, model: Model):
+    def __init__(self, model: Model, concurrency: int = 1, pack_token_budget: int = 0, parse_workers: int = 1, checkpoint_dir: str = "checkpoints",
+                 chunk_token_budget: Optional[int] = None, dedup: bool = True):
         self.model = model
-        self.pdf_parser = PDFParser()
+        self.concurrency = max(1, concurrency)
+        self.dedup = dedup
+        self.checkpoint_dir = checkpoint_dir
+        self.pdf_parser = PDFParser(workers=parse_workers)
+        self.packer = RequestPacker(pack_token_budget, model.count_tokens)
+        # None sizes the chunks from the model's context window, 0 disables chunking
+        if chunk_token_budget is None:
+            chunk_token_budget = model.chunk_token_budget()
+        self.chunker = TextChunker(chunk_token_budget, model.count_tokens)
         self.writer = Writer()
 
-    def translate_pdf(self, pdf_file_path: str, file_format: str = 'PDF', target_language: str = '中文', output_file_path: str = None, pages: Optional[int] = None):
-        self.book = self.pdf_parser.parse_pdf(pdf_file_path, pages)
+    def translate_pdf(self, pdf_file_path: str, file_format: str = 'PDF', target_language: str = '中文', output_file_path: str = None, pages: PageSelection = None, resume: bool = False,
+                      overwrite_checkpoint: bool = False):
+        self.translate_pdf_languages(pdf_file_path, file_format, [target_language], {target_language: output_file_path}, pages, resume, overwrite_checkpoint)
 
-        for page_idx, page in enumerate(self.book.pages):
-            for content_idx, content in enumerate(page.contents):
-                prompt = self.model.translate_prompt(content, target_language)
-                LOG.debug(prompt)
-                translation, status = self.model.make_request(prompt)
-                LOG.info(translation)
-                
-                # Update the content in self.book.pages directly
-                self.book.pages[page_idx].contents[content_idx].set_translation(translation, status)
+    def translate_pdf_languages(self, pdf_file_path: str, file_format: str = 'PDF', target_languages: List[str] = ('中文',), output_file_paths: Dict[str, str] = None,
+                                pages: PageSelection = None, resume: bool = False, overwrite_checkpoint: bool = False) -> Dict[str, str]:
+        # Parse the book once and translate it into every target language: the requests of all languages
+        # share one worker pool and every language is written to its own file as soon as it is done.
+        # The book is local to this call, so one PDFTranslator can serve concurrent translations.
+        # Returns the output path of every language, None where the writer's default name is used
+        target_languages = list(dict.fromkeys(target_languages))
+        output_file_paths = dict(output_file_paths or {})
+        for language in target_languages:
+            if output_file_paths.get(language) is None and len(target_languages) > 1:
+                output_file_paths[language] = _language_output_path(pdf_file_path, file_format, language)
 
-        self.writer.save_translated_book(self.book, output_file_path, file_format)
+        # Journal positions use the real page numbers, so any page selection of the book maps to the same records
+        page_indices = self.pdf_parser.page_indices(pdf_file_path, pages)
+        book = self.pdf_parser.parse_pdf(pdf_file_path, page_indices)
+
+        splitter = SegmentDeduplicator(self.dedup)
+        for page in book.pages:
+            splitter.split_running_lines(page)
+
+        # Every language fills the translations of its own copy of the parsed book
+        books = {language: book if idx == 0 else copy.deepcopy(book) for idx, language in enumerate(target_languages)}
+
+        with ExitStack() as stack:
+            journals = {language: stack.enter_context(TranslationJournal(pdf_file_path, language, self.checkpoint_dir, resume, overwrite_checkpoint))
+                        for language in books}
+            # Entered last, so the pool is drained before the journals are closed
+            executor = stack.enter_context(ThreadPoolExecutor(max_workers=self.concurrency))
+            submitted = {}
+            for language, language_book in books.items():
+                items = [
+                    ((page_idx, content_idx), content)
+                    for page_idx, page in zip(page_indices, language_book.pages)
+                    for content_idx, content in enumerate(page.contents)
+                ]
+                # Send all requests of all languages at once, then collect them language by language
+                deduplicator = SegmentDeduplicator(self.dedup)
+                submitted[language] = self._submit(executor, items, language, journals[language], deduplicator)
+                jobs, chunked, _ = submitted[language]
+                LOG.info(f"[{language}] Translating {sum(len(batch) for batch, _ in jobs)} segments of {len(items)} contents in {len(jobs)} requests, "
+                         f"{len(chunked)} oversized texts split into chunks, {deduplicator.duplicates} repeated contents and "
+                         f"{deduplicator.shared_cells} table cells reuse an earlier translation")
+
+            for language, language_submitted in submitted.items():
+                with METRICS.stage("translate"):
+                    self._collect(language_submitted, journals[language])
+                # The other languages keep translating in the pool while this one is written
+                self.writer.save_translated_book(books[language], output_file_paths.get(language), file_format)
+                failed = _failed_contents(books[language].pages)
+                if failed:
+                    LOG.warning(f"[{language}] {failed} contents could not be translated, run again with --resume to retry them")
+                else:
+                    journals[language].mark_complete()
+
+        if self.model.cache is not None:
+            LOG.info(f"Translation cache: {self.model.cache.stats()}")
+
+        return output_file_paths
+
+    def translate_pdf_streaming(self, pdf_file_path: str, file_format: str = 'PDF', target_language: str = '中文', output_file_path: str = None, pages: PageSelection = None, window: int = 4, resume: bool = False,
+                                overwrite_checkpoint: bool = False):
+        # Parse, translate and write page by page, keeping at most `window` pages in flight
+        window = max(1, window)
+        in_flight = deque()
+        deduplicator = SegmentDeduplicator(self.dedup)
+        failed = 0
+
+        with TranslationJournal(pdf_file_path, target_language, self.checkpoint_dir, resume, overwrite_checkpoint) as journal, \
+                self.writer.open_translated_book(pdf_file_path, output_file_path, file_format) as page_writer, \
+                ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            LOG.info(f"开始翻译: {page_writer.output_file_path}")
+
+            page_indices = self.pdf_parser.page_indices(pdf_file_path, pages)
+            for page_idx, page in zip(page_indices, self.pdf_parser.iter_pages(pdf_file_path, page_indices)):
+                deduplicator.split_running_lines(page)
+                items = [((page_idx, content_idx), content) for content_idx, content in enumerate(page.contents)]
+                in_flight.append((page, self._submit(executor, items, target_language, journal, deduplicator)))
+
+                if len(in_flight) >= window:
+                    failed += self._write_oldest(in_flight, page_writer, journal)
+
+            while in_flight:
+                failed += self._write_oldest(in_flight, page_writer, journal)
+
+            if failed:
+                LOG.warning(f"{failed} contents could not be translated, run again with --resume to retry them")
+            else:
+                journal.mark_complete()
+
+        if self.model.cache is not None:
+            LOG.info(f"Translation cache: {self.model.cache.stats()}")
+        LOG.info(f"{deduplicator.duplicates} repeated contents reused an earlier translation")
+        LOG.info(f"翻译完成: {page_writer.output_file_path}")
+
+    def _write_oldest(self, in_flight, page_writer, journal: TranslationJournal) -> int:
+        # Returns the number of failed contents of the written page
+        page, submitted = in_flight.popleft()
+        self._collect(submitted, journal)
+        page_writer.write_page(page)
+        return _failed_contents([page])
+
+    def _submit(self, executor, items, target_language: str, journal: TranslationJournal, deduplicator: SegmentDeduplicator):
+        positions, contents, chunked, duplicates = [], [], [], []
+        for position, content in items:
+            # Repeats of a content already in this run only wait for its translation
+            primary = deduplicator.primary_of(content)
+            if primary is not None:
+                duplicates.append((content, primary))
+                continue
+
+            if content.content_type == ContentType.TABLE:
+                # Cells an earlier table already sends are filled in from it after the requests,
+                # entries without a primary tell _collect to do so
+                if deduplicator.share_cells(content):
+                    duplicates.append((content, None))
+                # Tables of only numbers, empty or shared cells need no request
+                if not content.request_cells():
+                    content.set_cell_translations([], True)
+                    continue
+
+            # Segments finished by an earlier, interrupted run come straight from the journal
+            translation = journal.get(position, content)
+            if translation is not None:
+                content.set_translation(translation, True)
+                # A table journaled with other shared cells no longer matches and is translated again
+                if content.status:
+                    continue
+
+            chunks = self.chunker.split_content(content)
+            if chunks is None:
+                positions.append(position)
+                contents.append(content)
+            else:
+                # Oversized text goes out as separate chunk segments (no journal position of their own),
+                # _collect stitches them back and journals the whole text
+                chunked.append((position, content, chunks))
+                positions.extend([None] * len(chunks))
+                contents.extend(chunks)
+
+        jobs = []
+        offset = 0
+        # pack() keeps the content order, so batch positions are consecutive slices
+        for batch in self.packer.pack(contents):
+            batch_positions = positions[offset:offset + len(batch)]
+            offset += len(batch)
+            jobs.append((batch, executor.submit(self._translate_and_record, batch, batch_positions, target_language, journal)))
+        # Repeats that reuse a translation instead of being sent; without packing each is one request
+        # less, with packing they only shrink the packed requests, so this is not a request count
+        METRICS.increment("dedup_contents_reused", sum(primary is not None for _, primary in duplicates))
+        METRICS.increment("dedup_cells_reused", sum(len(content.shared_cells) for content, primary in duplicates if primary is None))
+        return jobs, chunked, duplicates
+
+    def _collect(self, submitted, journal: TranslationJournal):
+        jobs, chunked, duplicates = submitted
+        for batch, future in jobs:
+            for content, (translation, status) in zip(batch, future.result()):
+                # Update the content in the book pages directly
+                content.set_translation(translation, status)
+
+        for position, content, chunks in chunked:
+            status = all(chunk.status for chunk in chunks)
+            content.set_translation(self.chunker.stitch([chunk.translation for chunk in chunks]), status)
+            if status:
+                journal.record(position, content, content.translation)
+
+        # Primaries and shared cells come from this or an earlier page, so their translations are already in place
+        for content, primary in duplicates:
+            if primary is None:
+                content.resolve_shared_cells()
+            else:
+                content.copy_translation(primary)
+
+    def _translate_and_record(self, batch, positions, target_language: str, journal: TranslationJournal):
+        results = self._translate_batch(batch, target_language)
+        # Journal every segment as soon as it is done, so a crash only loses in-flight requests;
+        # a table only once its reply parses into its cells, a bad reply is retried on --resume
+        for position, content, (translation, status) in zip(positions, batch, results):
+            if not status or position is None:
+                continue
+            if content.content_type == ContentType.TABLE and not content.accepts_translation(translation):
+                continue
+            journal.record(position, content, translation)
+        return results
+
+    def _translate_batch(self, batch, target_language: str):
+        if len(batch) == 1:
+            return [self._translate_content(batch[0], target_language)]
+
+        packed_text = self.packer.join([content.original for content in batch])
+        prompt = self.model.make_packed_prompt(packed_text, target_language)
+        LOG.debug(prompt)
+        translations = None
+        try:
+            # Only a reply that splits back into every segment is cached
+            translation, status = self.model.make_request(
+                prompt, accept=lambda reply: self.packer.split(reply, len(batch)) is not None)
+            if status:
+                translations = self.packer.split(translation, len(batch))
+        except Exception as e:
+            LOG.error(f"An error occurred during packed translation: {e}")
+
+        if translations is not None:
+            LOG.info(translation)
+            return [(text, True) for text in translations]
+
+        LOG.warning(f"Packed translation of {len(batch)} segments could not be split back, retrying them one by one")
+        return [self._translate_content(content, target_language) for content in batch]
+
+    def _translate_content(self, content, target_language: str):
+        prompt = self.model.translate_prompt(content, target_language)
+        LOG.debug(prompt)
+        # A table reply that does not parse into its cells is neither cached nor served from the cache
+        accept = content.accepts_translation if content.content_type == ContentType.TABLE else None
+        try:
+            translation, status = self.model.make_request(prompt, accept=accept)
+        except Exception as e:
+            # A failed segment must not abort the other in-flight segments
+            LOG.error(f"An error occurred during translation: {e}")
+            return "", False
+        LOG.info(translation)
+        return translation, status
+
+
+def _failed_contents(pages) -> int:
+    # Text and table contents whose translation failed, the writers keep their original text
+    return sum(
+        not content.status
+        for page in pages
+        for content in page.contents
+        if content.content_type in (ContentType.TEXT, ContentType.TABLE)
+    )
+
+
+def _language_output_path(pdf_file_path: str, file_format: str, language: str) -> str:
+    extension = '.pdf' if file_format.lower() == 'pdf' else '.md'
+    return os.path.splitext(pdf_file_path)[0] + f"_translated_{language.replace(' ', '_')}{extension}"
@@ -0,0 +1,56 @@
+import re
+from typing import Callable, List, Optional
+from book import Content, ContentType
+from utils import estimate_tokens
+
+SEGMENT_MARKER = "<<<{}>>>"
+SEGMENT_PATTERN = re.compile(r"<<<\s*(\d+)\s*>>>")
+
+
+class RequestPacker:
+    def __init__(self, token_budget: int = 0, count_tokens: Callable[[str], int] = estimate_tokens):
+        # A budget of 0 disables packing, every content is sent on its own;
+        # count_tokens should be the model's tokenizer so batches really fit the budget
+        self.token_budget = token_budget
+        self.count_tokens = count_tokens
+        # Every packed segment also carries its <<<idx>>> marker line
+        self.marker_tokens = count_tokens(SEGMENT_MARKER.format(0) + "\n")
+
+    def pack(self, contents: List[Content]) -> List[List[Content]]:
+        batches = []
+        batch, batch_tokens = [], 0
+
+        for content in contents:
+            tokens = self.marker_tokens + self.count_tokens(content.original) if content.content_type == ContentType.TEXT else None
+
+            # Tables and oversized texts always travel alone
+            if tokens is None or tokens > self.token_budget:
+                if batch:
+                    batches.append(batch)
+                    batch, batch_tokens = [], 0
+                batches.append([content])
+                continue
+
+            if batch and batch_tokens + tokens > self.token_budget:
+                batches.append(batch)
+                batch, batch_tokens = [], 0
+
+            batch.append(content)
+            batch_tokens += tokens
+
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def join(self, texts: List[str]) -> str:
+        return "\n".join(f"{SEGMENT_MARKER.format(idx)}\n{text}" for idx, text in enumerate(texts))
+
+    def split(self, translation: str, count: int) -> Optional[List[str]]:
+        # parts = [preamble, idx_0, text_0, idx_1, text_1, ...]
+        parts = SEGMENT_PATTERN.split(translation)
+        indices = [int(idx) for idx in parts[1::2]]
+        texts = [text.strip() for text in parts[2::2]]
+
+        if indices != list(range(count)) or not all(texts):
+            return None
+        return texts
@@ -0,0 +1,65 @@
+import math
+import re
+from typing import Callable, Iterator, List, Optional
+from book import Content, ContentType
+
+# A sentence runs up to its closing punctuation (and the spaces after it) or to the end of the line
+SENTENCE_PATTERN = re.compile(r".+?(?:[.!?;。！？；]+\s*|$)")
+
+
+class TextChunker:
+    def __init__(self, token_budget: int, count_tokens: Callable[[str], int]):
+        # A budget of 0 disables chunking, every page text is sent whole
+        self.token_budget = token_budget
+        self.count_tokens = count_tokens
+
+    def split_content(self, content: Content) -> Optional[List[Content]]:
+        # None for tables and texts within the budget, otherwise one text content per chunk
+        if self.token_budget <= 0 or content.content_type != ContentType.TEXT:
+            return None
+        if self.count_tokens(content.original) <= self.token_budget:
+            return None
+        return [Content(content_type=ContentType.TEXT, original=chunk) for chunk in self.split(content.original)]
+
+    def split(self, text: str) -> List[str]:
+        chunks = []
+        chunk, chunk_tokens = [], 0
+
+        for piece, tokens in self._pieces(text):
+            if chunk and chunk_tokens + tokens > self.token_budget:
+                chunks.append("\n".join(chunk))
+                chunk, chunk_tokens = [], 0
+            chunk.append(piece)
+            chunk_tokens += tokens
+
+        if chunk:
+            chunks.append("\n".join(chunk))
+        return chunks
+
+    @staticmethod
+    def stitch(translations: List[str]) -> str:
+        return "\n".join(translation.strip() for translation in translations)
+
+    def _pieces(self, text: str) -> Iterator[tuple]:
+        # The parser joins the page's lines with "\n", so lines are the largest unit that
+        # never splits a sentence; over-long lines fall back to sentences, then to plain slices
+        for line in text.split("\n"):
+            tokens = self.count_tokens(line)
+            if tokens <= self.token_budget:
+                yield line, tokens
+                continue
+
+            for sentence in SENTENCE_PATTERN.findall(line):
+                sentence = sentence.strip()
+                tokens = self.count_tokens(sentence)
+                if tokens <= self.token_budget:
+                    yield sentence, tokens
+                else:
+                    yield from self._slices(sentence, tokens)
+
+    def _slices(self, sentence: str, tokens: int) -> Iterator[tuple]:
+        count = math.ceil(tokens / self.token_budget)
+        size = math.ceil(len(sentence) / count)
+        for start in range(0, len(sentence), size):
+            piece = sentence[start:start + size]
+            yield piece, self.count_tokens(piece)
@@ -4,13 +4,29 @@ class ArgumentParser:
     def __init__(self):
         self.parser = argparse.ArgumentParser(description='Translate English PDF book to Chinese.')
         self.parser.add_argument('--config', type=str, default='config.yaml', help='Configuration file with model and API settings.')
-        self.parser.add_argument('--model_type', type=str, required=True, choices=['GLMModel', 'OpenAIModel'], help='The type of translation model to use. Choose between "GLMModel" and "OpenAIModel".')        
+        self.parser.add_argument('--model_type', type=str, required=True, choices=['GLMModel', 'OpenAIModel', 'HedgedModel'], help='The type of translation model to use. Choose between "GLMModel", "OpenAIModel" and "HedgedModel" (the backends listed in the HedgedModel config section, with hedged and fallback requests).')        
         self.parser.add_argument('--glm_model_url', type=str, help='The URL of the ChatGLM model URL.')
+        self.parser.add_argument('--glm_pool_size', type=int, help='Number of keep-alive connections kept open to the ChatGLM server.')
         self.parser.add_argument('--timeout', type=int, help='Timeout for the API request in seconds.')
         self.parser.add_argument('--openai_model', type=str, help='The model name of OpenAI Model. Required if model_type is "OpenAIModel".')
         self.parser.add_argument('--openai_api_key', type=str, help='The API key for OpenAIModel. Required if model_type is "OpenAIModel".')
         self.parser.add_argument('--book', type=str, help='PDF file to translate.')
+        self.parser.add_argument('--target_language', type=str, nargs='+', help='Target language(s). Several languages are translated in one pass over the book, one output file each.')
         self.parser.add_argument('--file_format', type=str, help='The file format of translated book. Now supporting PDF and Markdown')
+        self.parser.add_argument('--concurrency', type=int, help='Number of segments translated in parallel.')
+        self.parser.add_argument('--parse_workers', type=int, help='Number of processes used to parse the PDF by page ranges.')
+        self.parser.add_argument('--pack_token_budget', type=int, help='Pack adjacent short text segments into one request of up to this many tokens. 0 disables packing.')
+        self.parser.add_argument('--chunk_token_budget', type=int, help='Split page texts longer than this many tokens into chunks translated separately. Defaults to a budget derived from the model, 0 disables chunking.')
+        self.parser.add_argument('--dedup', action=argparse.BooleanOptionalAction, help='Translate repeated contents (running headers, footers, identical tables) once and reuse the result.')
+        self.parser.add_argument('--stream', action='store_true', help='Parse, translate and write the book page by page instead of all at once.')
+        self.parser.add_argument('--stream_window', type=int, help='Maximum number of pages in flight in streaming mode.')
+        self.parser.add_argument('--checkpoint_dir', type=str, help='Directory of the per-book checkpoint journals.')
+        self.parser.add_argument('--resume', action='store_true', help='Reload the checkpoint journal of the book and only translate the missing segments.')
+        self.parser.add_argument('--overwrite_checkpoint', action='store_true', help='Discard the checkpoint journal of an unfinished earlier run instead of refusing to start.')
+        self.parser.add_argument('--cache_file', type=str, help='SQLite file of the translation memory cache.')
+        self.parser.add_argument('--cache_size', type=int, help='Maximum number of entries kept in the translation cache.')
+        self.parser.add_argument('--cache_mode', type=str, choices=['readwrite', 'warm', 'bypass'], help='"readwrite" serves cached translations, "warm" re-translates and refreshes the cache, "bypass" disables it.')
+        self.parser.add_argument('--metrics_report', type=str, help='Write a JSON report of stage timings, request latencies, token counts, retries and cache hits to this file.')
 
     def parse_arguments(self):
         args = self.parser.parse_args()
@@ -0,0 +1,128 @@
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, math.inf)
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        for idx, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.bucket_counts[idx] += 1
+                break
+
+    def cumulative(self):
+        total = 0
+        for upper, count in zip(self.buckets, self.bucket_counts):
+            total += count
+            yield upper, total
+
+    def quantile(self, q: float) -> float:
+        # Upper bound of the bucket holding the q-th observation
+        for upper, total in self.cumulative():
+            if self.count and total >= q * self.count:
+                return self.max if math.isinf(upper) else upper
+        return 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 4),
+            "max": round(self.max, 4),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": {_format_le(upper): total for upper, total in self.cumulative()},
+        }
+
+
+class Metrics:
+    # Process-wide collector for stage durations, latency histograms and counters of translation runs
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.counters = {}
+            self.histograms = {}
+            self.started_at = time.time()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - start)
+
+    def add_stage(self, name: str, seconds: float):
+        with self._lock:
+            count, total = self.stages.get(name, (0, 0.0))
+            self.stages[name] = (count + 1, total + seconds)
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram()
+            self.histograms[name].observe(value)
+
+    def increment(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+                "elapsed_seconds": round(time.time() - self.started_at, 3),
+                "stages": {name: {"count": count, "seconds": round(total, 4)} for name, (count, total) in self.stages.items()},
+                "counters": dict(self.counters),
+                "histograms": {name: histogram.to_dict() for name, histogram in self.histograms.items()},
+            }
+
+    def save_report(self, report_file_path: str):
+        with open(report_file_path, "w", encoding="utf-8") as report_file:
+            json.dump(self.report(), report_file, ensure_ascii=False, indent=2)
+
+    def to_prometheus(self, prefix: str = "translator") -> str:
+        # Prometheus text exposition format (version 0.0.4)
+        lines = []
+        with self._lock:
+            lines.append(f"# TYPE {prefix}_stage_seconds_total counter")
+            for name, (_, total) in self.stages.items():
+                lines.append(f'{prefix}_stage_seconds_total{{stage="{name}"}} {total}')
+            lines.append(f"# TYPE {prefix}_stage_runs_total counter")
+            for name, (count, _) in self.stages.items():
+                lines.append(f'{prefix}_stage_runs_total{{stage="{name}"}} {count}')
+            for name, value in self.counters.items():
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                lines.append(f"{prefix}_{name}_total {value}")
+            for name, histogram in self.histograms.items():
+                lines.append(f"# TYPE {prefix}_{name} histogram")
+                for upper, total in histogram.cumulative():
+                    lines.append(f'{prefix}_{name}_bucket{{le="{_format_le(upper)}"}} {total}')
+                lines.append(f"{prefix}_{name}_sum {histogram.sum}")
+                lines.append(f"{prefix}_{name}_count {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_le(upper: float) -> str:
+    return "+Inf" if math.isinf(upper) else f"{upper:g}"
+
+
+METRICS = Metrics()
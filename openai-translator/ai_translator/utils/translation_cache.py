@@ -0,0 +1,110 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_MODES = ("readwrite", "warm", "bypass")
+
+class TranslationCache:
+    """
+    On-disk translation memory backed by SQLite.
+
+    Modes:
+      - readwrite: serve hits from the cache and store new translations (default)
+      - warm: always call the backend, but store/refresh the results
+      - bypass: neither read nor write the cache
+    """
+
+    def __init__(self, db_path: str = "cache/translation_cache.db", max_entries: int = 100000, mode: str = "readwrite"):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unsupported cache mode: {mode}. Expected one of {CACHE_MODES}")
+
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if mode == "bypass":
+            return
+
+        cache_dir = os.path.dirname(db_path)
+        if cache_dir and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+        # Segments are translated from worker threads, all access goes through self._lock
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "key TEXT PRIMARY KEY, translation TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON translations (last_used)")
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    @staticmethod
+    def make_key(text: str, *parts: str) -> str:
+        # Whitespace differences (re-flowed lines, trailing spaces) must not cause a miss
+        normalized = " ".join(str(text).split())
+        payload = "\x1f".join([normalized, *(str(part) for part in parts)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        if self.mode != "readwrite":
+            return None
+
+        with self._lock:
+            row = self._conn.execute("SELECT translation FROM translations WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._conn.execute("UPDATE translations SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key: str, translation: str):
+        if self.mode == "bypass":
+            return
+
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM translations WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translations (key, translation, last_used) VALUES (?, ?, ?)",
+                (key, translation, time.time())
+            )
+            if not exists:
+                self._size += 1
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # Drop the least recently used entries once the cache grows past max_entries
+        overflow = self._size - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM translations WHERE key IN "
+                "(SELECT key FROM translations ORDER BY last_used ASC LIMIT ?)",
+                (overflow,)
+            )
+            self._size -= overflow
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "mode": self.mode,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": self._size if self._conn else 0,
+        }
+
+    def close(self):
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+                self._conn = None
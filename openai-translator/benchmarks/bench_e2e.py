@@ -0,0 +1,223 @@
+"""
+End-to-end translator benchmark against the local mock LLM server.
+
+Runs PDFTranslator from both the v1 tree (openai-translator) and the langchain tree
+(langchain/openai-translator) on the sample books and on generated large PDFs. Reports
+parse, translate and write time, segments/sec and peak RSS, and writes the results as
+JSON so runs can be compared over time.
+
+Every (tree, backend, pdf) combination runs in its own subprocess: both trees use the
+same top-level package names, and peak RSS is only meaningful per process.
+
+Usage (from the openai-translator directory):
+    python benchmarks/bench_e2e.py [--latency 0.05] [--jitter 0.02] [--error_rate 0.01]
+        [--concurrency 8] [--large_pages 200] [--languages 1] [--output bench_results.json]
+
+--languages N translates every book into N target languages in one pass, so its total time
+can be compared with the single-language run.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+V1_TREE = os.path.abspath(os.path.join(BENCH_DIR, ".."))
+LANGCHAIN_TREE = os.path.abspath(os.path.join(BENCH_DIR, "..", "..", "langchain", "openai-translator"))
+SAMPLE_PDFS = [os.path.join(V1_TREE, "tests", "test.pdf"), os.path.join(V1_TREE, "tests", "The_Old_Man_of_the_Sea.pdf")]
+
+
+def make_large_pdf(output_file_path: str, pages: int):
+    from reportlab.lib import colors, pagesizes
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, TableStyle, PageBreak
+
+    styles = getSampleStyleSheet()
+    paragraph = ("The old man was thin and gaunt with deep wrinkles in the back of his neck. "
+                 "Everything about him was old except his eyes and they were the same color as the sea. ")
+    story = []
+    for page_idx in range(pages):
+        story.append(Paragraph(f"Chapter {page_idx // 10 + 1}, page {page_idx + 1}", styles["Heading2"]))
+        for _ in range(4):
+            story.append(Paragraph(paragraph * 2, styles["Normal"]))
+        if page_idx % 5 == 0:
+            table = Table([["Day", "Catch", "Weight"]] + [[str(day), "marlin", f"{day * 7} kg"] for day in range(5)])
+            table.setStyle(TableStyle([('GRID', (0, 0), (-1, -1), 0.5, colors.black)]))
+            story.append(table)
+        story.append(PageBreak())
+    SimpleDocTemplate(output_file_path, pagesize=pagesizes.letter).build(story)
+
+
+def _timed(obj, method_name: str, timings: dict, stage: str, results: list = None):
+    # Wrap a bound method so its wall time is accumulated under `stage`,
+    # its return values are appended to `results` when given
+    method = getattr(obj, method_name)
+
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = method(*args, **kwargs)
+            if results is not None:
+                results.append(result)
+            return result
+        finally:
+            timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+    setattr(obj, method_name, wrapper)
+
+
+def run_worker(args) -> dict:
+    # Runs inside the subprocess for a single (tree, backend, pdf) combination
+    sys.path.insert(0, os.path.join(args.tree, "ai_translator"))
+    os.environ["OPENAI_API_KEY"] = "sk-mock"
+    os.environ["OPENAI_BASE_URL"] = args.url + "/v1"
+    os.environ["OPENAI_API_BASE"] = args.url + "/v1"
+
+    work_dir = tempfile.mkdtemp()
+    pdf_file_path = shutil.copy(args.pdf, work_dir)
+    os.chdir(work_dir)
+    timings = {}
+
+    from translator import PDFTranslator
+
+    if args.tree_name == "v1":
+        if args.backend == "glm":
+            from model import GLMModel
+            model = GLMModel(model_url=args.url, timeout=60, pool_size=args.concurrency)
+        else:
+            from model import OpenAIModel
+            model = OpenAIModel(model="gpt-3.5-turbo", api_key="sk-mock")
+        translator = PDFTranslator(model, concurrency=args.concurrency, checkpoint_dir=os.path.join(work_dir, "checkpoints"))
+    else:
+        translator = PDFTranslator("gpt-3.5-turbo", concurrency=args.concurrency)
+
+    # The translator keeps no reference to the book, take it from the parser
+    books = []
+    _timed(translator.pdf_parser, "parse_pdf", timings, "parse", books)
+    _timed(translator.writer, "save_translated_book", timings, "write")
+
+    languages = [f"Language {idx}" for idx in range(args.languages)]
+    start = time.perf_counter()
+    if args.languages == 1:
+        translator.translate_pdf(pdf_file_path, args.file_format)
+    elif args.tree_name == "v1":
+        translator.translate_pdf_languages(pdf_file_path, args.file_format, languages)
+    else:
+        translator.translate_pdf_languages(pdf_file_path, args.file_format, "English", languages)
+    total = time.perf_counter() - start
+
+    book = books[0]
+    contents = [content for page in book.pages for content in page.contents]
+    translate = total - timings.get("parse", 0.0) - timings.get("write", 0.0)
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "pages": len(book.pages),
+        "segments": len(contents),
+        "languages": args.languages,
+        "translated": sum(1 for content in contents if content.status),
+        "parse_s": round(timings.get("parse", 0.0), 4),
+        "translate_s": round(translate, 4),
+        "write_s": round(timings.get("write", 0.0), 4),
+        "total_s": round(total, 4),
+        "segments_per_s": round(len(contents) * args.languages / translate, 2) if translate else None,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def run_suite(args):
+    sys.path.insert(0, BENCH_DIR)
+    from mock_llm_server import start_server
+
+    server, url = start_server(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, retry_after=args.retry_after)
+    tmp_dir = tempfile.mkdtemp()
+    pdfs = list(SAMPLE_PDFS)
+    for pages in args.large_pages:
+        large_pdf = os.path.join(tmp_dir, f"generated_{pages}_pages.pdf")
+        make_large_pdf(large_pdf, pages)
+        pdfs.append(large_pdf)
+
+    combinations = [("v1", V1_TREE, backend) for backend in args.backends] + [("langchain", LANGCHAIN_TREE, "openai")]
+    runs = []
+    for tree_name, tree, backend in combinations:
+        for pdf in pdfs:
+            server.reset_counters()
+            result = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker",
+                 "--tree", tree, "--tree_name", tree_name, "--backend", backend, "--pdf", pdf,
+                 "--url", url, "--concurrency", str(args.concurrency), "--file_format", args.file_format,
+                 "--languages", str(args.languages)],
+                capture_output=True, text=True,
+            )
+            run = {"tree": tree_name, "backend": backend, "pdf": os.path.basename(pdf)}
+            if result.returncode == 0:
+                # The worker prints its JSON result as the last line, after the translator logs
+                run.update(json.loads(result.stdout.strip().splitlines()[-1]))
+            else:
+                run["error"] = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"exit code {result.returncode}"
+            run["server"] = server.reset_counters()
+            runs.append(run)
+            print(json.dumps(run, ensure_ascii=False))
+
+    server.shutdown()
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "settings": {
+            "latency": args.latency, "jitter": args.jitter, "error_rate": args.error_rate,
+            "retry_after": args.retry_after, "concurrency": args.concurrency, "file_format": args.file_format,
+            "languages": args.languages,
+        },
+        "runs": runs,
+    }
+    with open(args.output, "w", encoding="utf-8") as output_file:
+        json.dump(report, output_file, ensure_ascii=False, indent=2)
+    print(f"Results written to {args.output}")
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=BENCH_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end translator benchmark against a mock LLM server.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock server latency per request in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Extra uniformly random latency in seconds.")
+    parser.add_argument("--error_rate", type=float, default=0.0, help="Fraction of requests answered with 429.")
+    parser.add_argument("--retry_after", type=float, default=1.0, help="Retry-After of injected 429s in seconds.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--file_format", type=str, default="markdown")
+    parser.add_argument("--backends", nargs="+", default=["openai", "glm"], help="v1 backends to run.")
+    parser.add_argument("--large_pages", type=int, nargs="*", default=[200], help="Page counts of generated PDFs.")
+    parser.add_argument("--languages", type=int, default=1, help="Number of target languages translated in one pass.")
+    parser.add_argument("--output", type=str, default="bench_results.json")
+    # Internal: single run inside a subprocess
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--tree", type=str, help=argparse.SUPPRESS)
+    parser.add_argument("--tree_name", type=str, help=argparse.SUPPRESS)
+    parser.add_argument("--backend", type=str, help=argparse.SUPPRESS)
+    parser.add_argument("--pdf", type=str, help=argparse.SUPPRESS)
+    parser.add_argument("--url", type=str, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args)))
+    else:
+        run_suite(args)
+
+
+if __name__ == "__main__":
+    main()
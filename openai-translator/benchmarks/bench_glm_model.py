@@ -0,0 +1,84 @@
+"""
+Per-segment latency of GLMModel against the local mock ChatGLM server.
+
+Compares a new connection per request (plain requests.post, the former behaviour)
+with the pooled keep-alive session and the async client.
+
+Usage (from the openai-translator directory):
+    python benchmarks/bench_glm_model.py [--segments 200] [--latency 0.005] [--in_flight 16]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ai_translator"))
+
+import requests
+
+from model import GLMModel
+from mock_llm_server import start_server
+
+
+def bench_per_request_connection(url: str, prompts) -> list:
+    latencies = []
+    for prompt in prompts:
+        start = time.perf_counter()
+        requests.post(url, json={"prompt": prompt, "history": []}, timeout=30).json()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def bench_pooled(model: GLMModel, prompts) -> list:
+    latencies = []
+    for prompt in prompts:
+        start = time.perf_counter()
+        model.make_request(prompt)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def bench_async(model: GLMModel, prompts, in_flight: int) -> float:
+    semaphore = asyncio.Semaphore(in_flight)
+
+    async def translate(prompt):
+        async with semaphore:
+            return await model.amake_request(prompt)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(translate(prompt) for prompt in prompts))
+    elapsed = time.perf_counter() - start
+    await model.aclose()
+    return elapsed
+
+
+def report(name: str, latencies: list):
+    print(f"{name:28s} mean: {statistics.mean(latencies) * 1000:7.2f} ms  "
+          f"p95: {sorted(latencies)[int(len(latencies) * 0.95)] * 1000:7.2f} ms  total: {sum(latencies):6.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark GLMModel connection handling.")
+    parser.add_argument("--segments", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.005, help="Mock server latency per request in seconds.")
+    parser.add_argument("--in_flight", type=int, default=16, help="Concurrent requests in async mode.")
+    args = parser.parse_args()
+
+    server, url = start_server(latency=args.latency)
+    prompts = [f"翻译为中文：segment {idx}" for idx in range(args.segments)]
+
+    report("new connection per request", bench_per_request_connection(url, prompts))
+
+    model = GLMModel(model_url=url, timeout=30, pool_size=args.in_flight)
+    report("pooled keep-alive session", bench_pooled(model, prompts))
+
+    elapsed = asyncio.run(bench_async(GLMModel(model_url=url, timeout=30, pool_size=args.in_flight), prompts, args.in_flight))
+    print(f"{'async, ' + str(args.in_flight) + ' in flight':28s} per segment: {elapsed / len(prompts) * 1000:7.2f} ms  total: {elapsed:6.2f} s")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
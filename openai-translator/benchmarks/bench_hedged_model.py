@@ -0,0 +1,73 @@
+"""
+Tail latency of HedgedModel against two mock ChatGLM replicas that are occasionally slow.
+
+Every replica delays a fraction of its responses (--slow_rate) by --slow_latency seconds.
+A single GLMModel sees those slow responses in its p99, HedgedModel sends a hedge request
+to the other replica once a request is slower than the hedge percentile and takes the
+first answer. Also reports how many extra requests the hedges cost.
+
+Usage (from the openai-translator directory):
+    python benchmarks/bench_hedged_model.py [--segments 500] [--latency 0.02] [--slow_rate 0.03] [--slow_latency 1.0]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ai_translator"))
+
+from model import GLMModel, HedgedModel
+from mock_llm_server import start_server
+from utils import METRICS
+
+
+def bench(model, prompts) -> list:
+    latencies = []
+    for prompt in prompts:
+        start = time.perf_counter()
+        model.make_request(prompt)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(name: str, latencies: list, requests: int):
+    ordered = sorted(latencies)
+    print(f"{name:24s} mean: {statistics.mean(latencies) * 1000:7.2f} ms  p50: {ordered[len(ordered) // 2] * 1000:7.2f} ms  "
+          f"p99: {ordered[int(len(ordered) * 0.99)] * 1000:7.2f} ms  requests: {requests}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hedged requests across two replicas.")
+    parser.add_argument("--segments", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.02, help="Mock server latency per request in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.01, help="Extra uniformly random latency in seconds.")
+    parser.add_argument("--slow_rate", type=float, default=0.03, help="Fraction of slow responses per replica.")
+    parser.add_argument("--slow_latency", type=float, default=1.0, help="Extra seconds of a slow response.")
+    parser.add_argument("--hedge_percentile", type=float, default=0.95)
+    args = parser.parse_args()
+
+    servers = [start_server(latency=args.latency, jitter=args.jitter, slow_rate=args.slow_rate, slow_latency=args.slow_latency)
+               for _ in range(2)]
+    prompts = [f"翻译为中文：segment {idx}" for idx in range(args.segments)]
+
+    single = GLMModel(model_url=servers[0][1], timeout=30)
+    latencies = bench(single, prompts)
+    report("single replica", latencies, sum(server.reset_counters()["requests"] for server, _ in servers))
+
+    hedged = HedgedModel([GLMModel(model_url=url, timeout=30) for _, url in servers], hedge_percentile=args.hedge_percentile,
+                         initial_hedge_delay=args.latency * 5)
+    METRICS.reset()
+    latencies = bench(hedged, prompts)
+    report("hedged, two replicas", latencies, sum(server.reset_counters()["requests"] for server, _ in servers))
+    counters = METRICS.report()["counters"]
+    print(f"hedged requests: {counters.get('hedged_requests', 0)}  won by the hedge: {counters.get('hedge_wins', 0)}")
+    print(f"backends: {hedged.backend_stats()}")
+
+    hedged.close()
+    for server, _ in servers:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
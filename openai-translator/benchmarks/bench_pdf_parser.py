@@ -0,0 +1,80 @@
+"""
+Microbenchmark for separating page text from table cells in PDFParser.
+
+Compares the former per-cell ``str.replace`` stripping with the bounding-box
+filter used by ``translator.pdf_parser``.
+
+Usage (from the openai-translator directory):
+    python benchmarks/bench_pdf_parser.py [--pages 50] [--tables_per_page 4]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ai_translator"))
+
+import pdfplumber
+from reportlab.lib import colors, pagesizes
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, TableStyle, PageBreak
+
+from translator.pdf_parser import _extract_text_and_tables
+
+
+def legacy_extract_text_and_tables(pdf_page):
+    raw_text = pdf_page.extract_text()
+    tables = pdf_page.extract_tables()
+    for table_data in tables:
+        for row in table_data:
+            for cell in row:
+                raw_text = raw_text.replace(cell or "", "", 1)
+    return raw_text, tables
+
+
+def make_table_dense_pdf(output_file_path: str, pages: int, tables_per_page: int, rows: int = 12, cols: int = 5):
+    styles = getSampleStyleSheet()
+    grid = TableStyle([('GRID', (0, 0), (-1, -1), 0.5, colors.black), ('FONTSIZE', (0, 0), (-1, -1), 6)])
+    story = []
+    for page_idx in range(pages):
+        story.append(Paragraph(f"Page {page_idx}: quarterly figures for the product line.", styles["Normal"]))
+        for table_idx in range(tables_per_page):
+            data = [[f"item {page_idx}-{table_idx}-{row}-{col}" for col in range(cols)] for row in range(rows)]
+            table = Table(data)
+            table.setStyle(grid)
+            story.append(table)
+        story.append(PageBreak())
+    SimpleDocTemplate(output_file_path, pagesize=pagesizes.letter).build(story)
+
+
+def bench(pdf_file_path: str, extract) -> float:
+    elapsed = 0.0
+    with pdfplumber.open(pdf_file_path) as pdf:
+        for pdf_page in pdf.pages:
+            start = time.perf_counter()
+            extract(pdf_page)
+            elapsed += time.perf_counter() - start
+            pdf_page.flush_cache()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark table-cell exclusion in PDFParser.")
+    parser.add_argument("--pages", type=int, default=50, help="Pages of the synthetic table-dense PDF.")
+    parser.add_argument("--tables_per_page", type=int, default=4, help="Tables per synthetic page.")
+    args = parser.parse_args()
+
+    tests_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        synthetic_pdf = os.path.join(tmp_dir, "table_dense.pdf")
+        make_table_dense_pdf(synthetic_pdf, args.pages, args.tables_per_page)
+
+        for pdf_file_path in [os.path.join(tests_dir, "The_Old_Man_of_the_Sea.pdf"), os.path.join(tests_dir, "test.pdf"), synthetic_pdf]:
+            legacy = bench(pdf_file_path, legacy_extract_text_and_tables)
+            geometry = bench(pdf_file_path, _extract_text_and_tables)
+            print(f"{os.path.basename(pdf_file_path):32s} replace: {legacy:8.3f}s  bbox filter: {geometry:8.3f}s  speedup: {legacy / geometry:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
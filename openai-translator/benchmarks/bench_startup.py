@@ -0,0 +1,114 @@
+"""
+Startup-time regression guard for the translator CLI.
+
+Runs ``python -X importtime ai_translator/main.py --help`` and fails (exit code 1) when
+a heavy dependency is imported before argument parsing, directly or through any chain of
+package imports, or the total import time exceeds the budget.
+
+Usage (from the translator directory):
+    python benchmarks/bench_startup.py [--budget_ms 150] [--runs 5]
+    python benchmarks/bench_startup.py --self_check   # proves a transitive heavy import is caught
+"""
+import argparse
+import os
+import statistics
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+MAIN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ai_translator", "main.py")
+
+HEAVY_MODULES = {
+    "pandas", "PIL", "reportlab", "pdfplumber", "openai", "loguru", "httpx", "requests",
+    "langchain", "langchain_openai", "langchain_core", "gradio", "flask", "tiktoken",
+}
+
+
+def import_times(main_path: str) -> (dict, set):
+    # Top-level module name -> cumulative import time in microseconds,
+    # plus the names of all modules imported at any nesting depth
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", main_path, "--help"],
+        capture_output=True, text=True, check=True,
+    )
+    times, modules = {}, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.add(name.strip())
+        # Nested imports are indented, only the outermost ones add up to the total
+        if not name.startswith("  "):
+            times[name.strip()] = int(cumulative)
+    return times, modules
+
+
+def heavy_modules(modules) -> list:
+    return sorted(name for name in modules if name.split(".")[0] in HEAVY_MODULES)
+
+
+def self_check():
+    # A CLI whose package __init__ pulls in a stand-in "pandas" two levels down must be flagged
+    work_dir = tempfile.mkdtemp()
+    try:
+        os.makedirs(os.path.join(work_dir, "utils"))
+        with open(os.path.join(work_dir, "pandas.py"), "w") as module_file:
+            module_file.write("")
+        with open(os.path.join(work_dir, "utils", "__init__.py"), "w") as module_file:
+            module_file.write("from .logger import LOG\n")
+        with open(os.path.join(work_dir, "utils", "logger.py"), "w") as module_file:
+            module_file.write("import pandas\nLOG = None\n")
+        main_path = os.path.join(work_dir, "main.py")
+        with open(main_path, "w") as module_file:
+            module_file.write("import utils\n")
+
+        _, modules = import_times(main_path)
+        heavy = heavy_modules(modules)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if heavy != ["pandas"]:
+        print(f"FAIL: transitive import of pandas not detected, found {heavy}")
+        sys.exit(1)
+    print("OK: transitive heavy import detected")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Guard the CLI startup time.")
+    parser.add_argument("--main", type=str, default=MAIN_PATH, help="Path of the CLI entry point.")
+    parser.add_argument("--budget_ms", type=float, default=150, help="Maximum total import time of --help.")
+    parser.add_argument("--runs", type=int, default=5, help="Number of timed --help runs.")
+    parser.add_argument("--self_check", action="store_true", help="Check that the guard catches a heavy import nested in a package.")
+    args = parser.parse_args()
+
+    if args.self_check:
+        self_check()
+        return
+
+    times, modules = import_times(args.main)
+    total_ms = sum(times.values()) / 1000
+    heavy = heavy_modules(modules)
+
+    wall_times = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, args.main, "--help"], capture_output=True, check=True)
+        wall_times.append(time.perf_counter() - start)
+
+    print(f"imports: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms), "
+          f"--help wall time: {statistics.median(wall_times) * 1000:.1f} ms median of {args.runs}")
+    for name, cumulative in sorted(times.items(), key=lambda item: -item[1])[:10]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    if heavy:
+        print(f"FAIL: heavy modules imported before argument parsing: {', '.join(heavy)}")
+        sys.exit(1)
+    if total_ms > args.budget_ms:
+        print("FAIL: import time over budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
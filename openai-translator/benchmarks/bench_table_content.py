@@ -0,0 +1,72 @@
+"""
+Memory and iteration cost of 1,000 TableContent objects, compared with the DataFrame-backed layout,
+and the prompt tokens of one table sent as the padded text rendering versus the JSON array of its
+unique translatable cells.
+
+Usage (from the openai-translator directory):
+    python benchmarks/bench_table_content.py [--tables 1000] [--rows 12] [--cols 5]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ai_translator"))
+
+import pandas as pd
+
+from book import TableContent
+from utils import count_tokens
+
+
+def measure(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    objects = build()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return objects, current, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TableContent storage.")
+    parser.add_argument("--tables", type=int, default=1000)
+    parser.add_argument("--rows", type=int, default=12)
+    parser.add_argument("--cols", type=int, default=5)
+    args = parser.parse_args()
+
+    data = [[[f"cell {table}-{row}-{col}" for col in range(args.cols)] for row in range(args.rows)] for table in range(args.tables)]
+
+    frames, frame_bytes, frame_build = measure(lambda: [pd.DataFrame(table) for table in data])
+    tables, table_bytes, table_build = measure(lambda: [TableContent(table) for table in data])
+
+    start = time.perf_counter()
+    for frame in frames:
+        for row_idx, row in frame.iterrows():
+            for col_idx, item in enumerate(row):
+                frame.at[row_idx, col_idx] = item
+    frame_iter = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for table in tables:
+        for row_idx, col_idx, item in list(table.iter_items()):
+            table.update_item(row_idx, col_idx, item)
+    table_iter = time.perf_counter() - start
+
+    print(f"{'DataFrame':12s} memory: {frame_bytes / 1024:9.1f} KiB  build: {frame_build:6.3f}s  iter+update: {frame_iter:6.3f}s")
+    print(f"{'TableContent':12s} memory: {table_bytes / 1024:9.1f} KiB  build: {table_build:6.3f}s  iter+update: {table_iter:6.3f}s")
+
+    # A typical report table: repeated labels, numeric columns and empty cells
+    report = TableContent([["Region", "Product", "Units", "Revenue", "Notes"]] + [
+        [f"Region {row % 3}", f"Product {row % 4}", str(row * 17), f"{row * 1234.5:,.2f}", "" if row % 2 else "Backordered"]
+        for row in range(args.rows)
+    ])
+    text_tokens = count_tokens(report.get_original_as_str(), "gpt-3.5-turbo")
+    json_tokens = count_tokens(report.get_cells_as_json(), "gpt-3.5-turbo")
+    print(f"{'Table prompt':12s} text: {text_tokens} tokens  JSON cells: {json_tokens} tokens  ({len(report.translatable_cells())} unique cells)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Local stand-in for the LLM backends, so the translator can be measured without a real model.
+
+Speaks both APIs used by the translators:
+  - OpenAI: POST /v1/chat/completions and POST /v1/completions
+  - ChatGLM: POST to any other path with {"prompt", "history"} -> {"response", ...}
+
+The "translation" echoes the source text (everything after the instruction prefix), so
+packed segment markers and table cell arrays survive the round trip.
+
+Usage:
+    python benchmarks/mock_llm_server.py --port 8000 --latency 0.05 --jitter 0.02 --error_rate 0.01
+        [--slow_rate 0.02 --slow_latency 2.0]
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_translation(text: str) -> str:
+    # v1 prompts look like "翻译为中文：<text>", keep only the text
+    return text.split("：", 1)[1] if "：" in text else text
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep the connection alive between requests
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        server = self.server
+        server.count("requests")
+
+        time.sleep(server.latency + random.uniform(0, server.jitter))
+        if random.random() < server.slow_rate:
+            # Tail latency: a few responses are much slower than the rest
+            server.count("slow")
+            time.sleep(server.slow_latency)
+
+        if random.random() < server.error_rate:
+            server.count("rate_limited")
+            self._send_json(429, {"error": {
+                "message": "Rate limit reached (mock).",
+                "type": "requests",
+                "code": "rate_limit_exceeded",
+            }}, headers={"Retry-After": f"{server.retry_after:g}"})
+            return
+
+        if self.path.endswith("/chat/completions"):
+            content = fake_translation(body["messages"][-1]["content"])
+            self._send_json(200, {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": _usage(body["messages"][-1]["content"], content),
+            })
+        elif self.path.endswith("/completions"):
+            text = fake_translation(body.get("prompt", ""))
+            self._send_json(200, {
+                "id": "cmpl-mock",
+                "object": "text_completion",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [{"index": 0, "text": text, "finish_reason": "stop", "logprobs": None}],
+                "usage": _usage(body.get("prompt", ""), text),
+            })
+        else:
+            self._send_json(200, {
+                "response": fake_translation(body.get("prompt", "")),
+                "history": body.get("history") or [],
+                "status": 200,
+            })
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _usage(prompt: str, completion: str) -> dict:
+    prompt_tokens, completion_tokens = len(prompt) // 4 + 1, len(completion) // 4 + 1
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, retry_after: float = 1.0,
+                 slow_rate: float = 0.0, slow_latency: float = 0.0):
+        super().__init__(address, MockLLMHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.counters = {"requests": 0, "rate_limited": 0, "slow": 0}
+        self._lock = threading.Lock()
+
+    def count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def reset_counters(self) -> dict:
+        with self._lock:
+            counters, self.counters = self.counters, {"requests": 0, "rate_limited": 0, "slow": 0}
+        return counters
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, retry_after: float = 1.0, slow_rate: float = 0.0, slow_latency: float = 0.0):
+    # Serve in a daemon thread and return the server with its base URL
+    server = MockLLMServer((host, port), latency, jitter, error_rate, retry_after, slow_rate, slow_latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock LLM server for translator benchmarks.")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra uniformly random seconds per response.")
+    parser.add_argument("--error_rate", type=float, default=0.0, help="Fraction of requests answered with 429.")
+    parser.add_argument("--retry_after", type=float, default=1.0, help="Retry-After header of injected 429s.")
+    parser.add_argument("--slow_rate", type=float, default=0.0, help="Fraction of responses delayed by --slow_latency.")
+    parser.add_argument("--slow_latency", type=float, default=0.0, help="Extra seconds of the slow responses.")
+    args = parser.parse_args()
+
+    server, url = start_server(args.host, args.port, args.latency, args.jitter, args.error_rate, args.retry_after,
+                               args.slow_rate, args.slow_latency)
+    print(f"Mock LLM server listening on {url} (OpenAI base URL: {url}/v1)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()